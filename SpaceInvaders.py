@@ -6,7 +6,7 @@ It reads in information from a companion file.
 '''
 
 #imports
-from pgl import GWindow, GRect, GLabel, GImage
+from pgl import GWindow, GRect, GLabel, GBoundLabel, GImage
 from SpaceInvadersClasses import Ship, Bulwark, Player
 from tokenscanner import TokenScanner
 
@@ -78,9 +78,10 @@ def SpaceInvaders(file):
                     if i == 1 or i == 3:
                         alien.dx = -alien.dx
                     #timers
-                    gw.set_interval(alien.shoot, 3000)
-                    gw.set_interval(alien.move_horizontal, 30)
-                    gw.set_interval(alien.move_vertical, 2000)
+                    #owned by the alien, so they stop when it is removed
+                    alien.set_interval(alien.shoot, 3000)
+                    alien.set_interval(alien.move_horizontal, 30)
+                    alien.set_interval(alien.move_vertical, 2000)
 
     def key_action(e):
         '''This function is called when a key is pressed. 
@@ -103,28 +104,17 @@ def SpaceInvaders(file):
     def remove_all():
         '''This function removes all bulwarks and the player from the screen. 
         It is called when the player loses the game.'''
-        for x in range(0,700,50):
-            for y in range(500,700,50):
-                obj = gw.get_element_at(x,y)
-                if obj != background:
-                    gw.remove(obj)
+        #one range query over the bottom of the screen;
+        #the player is a kind of Bulwark
+        for obj in gw.get_elements_in(0, 500, 700, 200):
+            if isinstance(obj, Bulwark):
+                gw.remove(obj)
 
     def check_points():
         '''This function maintains the points counter.'''
-        #checks points
+        #the label only changes on screen when the score does
+        points_label.refresh()
         points = player.get_points()
-        #label creation
-        points_label = GLabel(f"SCORE: {points:>5}")
-        points_label.set_font('20px "sans-serif"')
-        points_label.set_color('white')
-        points_x = 10
-        points_y = points_label.get_ascent() + 10
-        obj = gw.get_element_at(points_x, points_y)
-        #removes previous label
-        if obj != background:
-            gw.remove(obj)
-        #adds new label
-        gw.add(points_label, points_x, points_y)
         #win condition and announcement:
         if points == (30*7 + 20*14 + 10*14):
             win_label = GLabel("CONGRATULATIONS!")
@@ -138,20 +128,12 @@ def SpaceInvaders(file):
 
     def check_lives():
         '''This function maintains the life counter.'''
-        #checks lives
+        #the label only changes on screen when the lives do
+        if lives_label.refresh():
+            #keeps the label against the right edge
+            lives_label.set_location(700 - (lives_label.get_width() + 10),
+                                     lives_label.get_y())
         lives = player.get_lives()
-        #label creation
-        lives_label = GLabel(f"LIVES: {lives:>2}")
-        lives_label.set_font('20px "sans-serif"')
-        lives_label.set_color('white')
-        lives_x = 700 - (lives_label.get_width() + 10)
-        lives_y = lives_label.get_ascent() + 10
-        obj = gw.get_element_at(lives_x, lives_y)
-        #removes previous label
-        if obj != background:
-            gw.remove(obj)
-        #adds new label 
-        gw.add(lives_label, lives_x, lives_y)
         #lose condition and announcement:
         if lives == 0:
             remove_all()
@@ -212,6 +194,7 @@ def SpaceInvaders(file):
             gw.add(controls, controls_x, controls_y)
     
             #defining aliens
+            aliens = []
             for i in range(5):
                 for j in alienlocs[i]:
                     x = j[0]
@@ -236,17 +219,20 @@ def SpaceInvaders(file):
                         alien.set_alternate_image("alien3.red.png")
                     alien.set_gw(gw)
                     alien.set_background(background)
-                    #add them
-                    gw.add(alien)
+                    aliens.append(alien)
+            #add them all at once
+            gw.add_all(aliens)
 
             #defining and adding bulwarks
+            bulwarks = []
             for i in bulwarklocs:
                 x = i[0]
                 y = i[1]
                 bulwark = Bulwark("bulwark.png",bulwark_lives[0],x,y)
                 bulwark.set_alternate_image("bulwark.red.png")
                 bulwark.set_gw(gw)
-                gw.add(bulwark)
+                bulwarks.append(bulwark)
+            gw.add_all(bulwarks)
 
             #defining and adding player
             player_x = playerstart[0][0]
@@ -257,9 +243,23 @@ def SpaceInvaders(file):
             player.set_background(background)
             gw.add(player)
 
-            #points and lives label timers
-            gw.set_interval(check_points, 1000)
-            gw.set_interval(check_lives, 1000)
+            #points and lives labels, created once and refreshed
+            points_label = GBoundLabel(player.get_points, "SCORE: {:>5}")
+            points_label.set_font('20px "sans-serif"')
+            points_label.set_color('white')
+            points_y = points_label.get_ascent() + 10
+            gw.add(points_label, 10, points_y)
+            lives_label = GBoundLabel(player.get_lives, "LIVES: {:>2}")
+            lives_label.set_font('20px "sans-serif"')
+            lives_label.set_color('white')
+            lives_x = 700 - (lives_label.get_width() + 10)
+            lives_y = lives_label.get_ascent() + 10
+            gw.add(lives_label, lives_x, lives_y)
+
+            #the player tells each label when its value changes,
+            #so nothing has to check them on a timer
+            player.add_points_listener(check_points)
+            player.add_lives_listener(check_lives)
 
             #animation / playing:
             #alien movement 
@@ -17,6 +17,7 @@ class Ship(GImage):
         self.dx = 1
         self.dy = 2
         self.points = points
+        self.points_listeners = []
 
     def __str__(self):
         '''Returns a string representation of the object.'''
@@ -74,19 +75,20 @@ class Ship(GImage):
             self.gw.add(self.bullet, bullet_x, bullet_y)
             #start bullet moving 
             self.bullet.set_firing(True)
-            self.gw.set_interval(self.bullet.firing, 30)
+            self.bullet.set_interval(self.bullet.firing, 30)
 
     def no_obstructions(self):
         '''Determines if there are any objects (other than the background) 
         below the ship; stops checking at the level of the bulwarks.'''
-        i = self.get_y() + self.get_height() + 2
+        y = self.get_y() + self.get_height() + 2
         x = self.get_x() + self.get_width()/2
         state = True
-        while i < 510:
-            obstruction = self.gw.get_element_at(x,i)
-            if obstruction != self.background:
-                state = False
-            i += 10
+        #one ray straight down instead of a probe every 10 pixels;
+        #only other ships block the shot, not bullets or labels
+        if y < 510:
+            for obstruction in self.gw.raycast(x, y, 0, 1, 510 - y):
+                if isinstance(obstruction, Ship):
+                    state = False
         return state
 
     def set_gw(self,gw):
@@ -114,6 +116,16 @@ class Ship(GImage):
     def add_points(self, points):
         '''Adds a desgnated number of points to the ship's point count.'''
         self.points += points 
+        self.notify_listeners(self.points_listeners)
+
+    def add_points_listener(self, listener):
+        '''Adds a function that is called whenever the ship's points change.'''
+        self.points_listeners.append(listener)
+
+    def notify_listeners(self, listeners):
+        '''Calls the given listeners, so displays update as soon as something changes.'''
+        for listener in listeners:
+            listener()
                 
 
 class Bulwark(Ship):
@@ -125,6 +137,7 @@ class Bulwark(Ship):
         '''Creates a Bulwark object with the given attributes.'''
         Ship.__init__(self, image,x,y)
         self.lives = lives
+        self.lives_listeners = []
 
     def __str__(self):
         '''Returns a string representation of the object.'''
@@ -137,11 +150,16 @@ class Bulwark(Ship):
         self.gw.set_timeout(self.remove_alt, 100)
         if self.lives == 0:
             self.gw.remove(self)
+        self.notify_listeners(self.lives_listeners)
 
     def get_lives(self):
         '''Returns the number of lives the Bulwark has.'''
         return self.lives
 
+    def add_lives_listener(self, listener):
+        '''Adds a function that is called whenever the Bulwark's lives change.'''
+        self.lives_listeners.append(listener)
+
 
 class Player(Bulwark):
     '''
@@ -176,7 +194,7 @@ class Player(Bulwark):
         so it fires.'''
         #it goes
         self.bullet.set_firing(True)
-        self.gw.set_interval(self.bullet.firing, 30)
+        self.bullet.set_interval(self.bullet.firing, 30)
 
 
 class Bullet(GRect):
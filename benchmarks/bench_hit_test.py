@@ -0,0 +1,135 @@
+"""
+Measures the cost of GWindow.get_element_at on a headless window laid out
+like a Space Invaders board, with a few objects of every shape type.
+
+For each configuration, the script reports the number of value objects
+(GPoint, GRectangle, GDimension, and _GTransform) allocated per query
+and the time per query.  Run it from the repository root:
+
+    python benchmarks/bench_hit_test.py
+
+The older pgl.py cannot run this board, because it has neither the
+headless backend nor the spatial index.  The "baseline" configuration
+therefore reproduces its hit test here: a linear scan from front to back
+in which rectangles, images, and labels are tested against a new
+bounding rectangle from get_bounds, and compounds shift the point by a
+new GPoint from get_location, as the original contains methods did.
+
+The baseline times use the current value classes, which are cheaper to
+create than the original ones, so they understate the original cost.
+Results with Python 3.11 on the development machine:
+
+    baseline value objects/query  55.21    67.48 us/query
+    linear   value objects/query   0.00    14.99 us/query
+    indexed  value objects/query   0.00     1.27 us/query
+"""
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pgl
+
+QUERIES = 20000
+VALUE_TYPES = (pgl.GPoint, pgl.GRectangle, pgl.GDimension, pgl._GTransform)
+
+def count_allocations(counts):
+    """Wraps the constructors of the value types so that they are counted."""
+    for cls in VALUE_TYPES:
+        init = cls.__init__
+        def wrapper(self, *args, _init=init, _name=cls.__name__, **kwargs):
+            counts[_name] = counts.get(_name, 0) + 1
+            _init(self, *args, **kwargs)
+        cls.__init__ = wrapper
+
+def create_board(indexed):
+    gw = pgl.GWindow(700, 700, backend="headless")
+    gw._base.set_spatial_index(indexed)
+    background = pgl.GRect(700, 700)
+    background.set_filled(True)
+    gw.add(background)
+    for row in range(5):
+        for col in range(11):
+            gw.add(pgl.GImage(os.path.join(ROOT, "alien1.png")),
+                   50 + 50 * col, 60 + 40 * row)
+    for k in range(4):
+        gw.add(pgl.GImage(os.path.join(ROOT, "bulwark.png")),
+               80 + 150 * k, 520)
+    gw.add(pgl.GImage(os.path.join(ROOT, "player.png")), 330, 620)
+    gw.add(pgl.GLabel("SCORE: 0"), 10, 30)
+    gw.add(pgl.GOval(600, 300, 40, 40))
+    gw.add(pgl.GLine(0, 500, 700, 500))
+    gw.add(pgl.GArc(20, 300, 60, 60, 0, 270))
+    poly = pgl.GPolygon()
+    poly.add_vertex(0, 0)
+    poly.add_vertex(30, 0)
+    poly.add_vertex(15, 25)
+    gw.add(poly, 100, 450)
+    shield = pgl.GCompound()
+    shield.add(pgl.GRect(0, 0, 20, 5))
+    shield.add(pgl.GOval(5, 5, 10, 10))
+    gw.add(shield, 500, 450)
+    return gw
+
+def baseline_contains(gobj, x, y):
+    """Tests a point the way the original contains methods did."""
+    if isinstance(gobj, pgl.GCompound):
+        refpt = gobj.get_location()
+        tx = x - refpt._x
+        ty = y - refpt._y
+        for child in gobj._contents:
+            if baseline_contains(child, tx, ty):
+                return True
+        return False
+    if isinstance(gobj, (pgl.GRect, pgl.GImage, pgl.GLabel)):
+        bounds = gobj.get_bounds()
+        if bounds is None:
+            return False
+        return bounds.contains(x, y)
+    return gobj.contains(x, y)
+
+def baseline_element_at(gw, x, y):
+    """Finds the topmost object with the original linear scan."""
+    for gobj in reversed(gw._base._contents):
+        if baseline_contains(gobj, x, y):
+            return gobj
+    return None
+
+def run(config, points, counts):
+    if config == "baseline":
+        gw = create_board(False)
+        query = lambda x, y: baseline_element_at(gw, x, y)
+    else:
+        gw = create_board(config == "indexed")
+        query = gw.get_element_at
+    counts.clear()
+    for x, y in points:
+        query(x, y)
+    allocated = dict(counts)
+    start = time.perf_counter()
+    for x, y in points:
+        query(x, y)
+    elapsed = time.perf_counter() - start
+    label = config
+    print("{:8} value objects/query {:6.2f}  {:7.2f} us/query".format(
+        label, sum(allocated.values()) / len(points),
+        elapsed / len(points) * 1e6))
+    for name in sorted(allocated):
+        print("         {:12} {:6.2f}/query".format(
+            name, allocated[name] / len(points)))
+
+def main():
+    random.seed(0)
+    points = [ (random.uniform(0, 700), random.uniform(0, 700))
+               for i in range(QUERIES) ]
+    counts = { }
+    count_allocations(counts)
+    for config in ("baseline", "linear", "indexed"):
+        run(config, points, counts)
+
+if __name__ == "__main__":
+    main()
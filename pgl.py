@@ -6,12 +6,21 @@ Tkinter, which is the most common graphics package for use with Python.
 """
 
 import atexit
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import heapq
 import inspect
 import io
 import math
+import os
+import queue
 import ssl
 import sys
+import threading
 import time
+import traceback
 import urllib.request
 
 # Version information
@@ -29,14 +38,29 @@ try:
     except Exception:
         import tk_font                      # pylint: disable=import-error
 except Exception as e:
+    tkinter = None
     print('Could not load tkinter: ' + str(e))
 
 try:
-    from PIL import ImageTk, Image          # pylint: disable=import-error
+    from PIL import Image                   # pylint: disable=import-error
+    from PIL import ImageColor, ImageDraw   # pylint: disable=import-error
+    from PIL import ImageFont               # pylint: disable=import-error
     _image_model = "PIL"
 except Exception:
     _image_model = "PhotoImage"
 
+try:
+    from PIL import ImageTk                 # pylint: disable=import-error
+except Exception:
+    ImageTk = None
+
+try:
+    from PIL import GifImagePlugin          # pylint: disable=import-error
+    from PIL import ImageGrab               # pylint: disable=import-error
+except Exception:
+    GifImagePlugin = None
+    ImageGrab = None
+
 spyder_flag = False
 
 try:
@@ -77,10 +101,13 @@ class GWindow(object):
     DEFAULT_WIDTH = 500
     DEFAULT_HEIGHT = 300
     MIN_WAKEUP = 20
+    DEFAULT_CAPTURE_FPS = 30
+    DEFAULT_CAPTURE_QUEUE = 64
 
 # Constructor: GWindow
 
-    def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                 backend="tk", clock="real"):
         """
         The constructor takes either of the following forms:
 
@@ -90,27 +117,63 @@ class GWindow(object):
         </pre>
 
         If the dimensions are missing, the constructor creates a
-        <code>GWindow</code> with a default size.
-        """
-        try:
-            tk = tkinter._root
-            tk.deiconify()
-        except AttributeError:
-            tk = tkinter.Tk()
-            tkinter._root = tk
+        <code>GWindow</code> with a default size.  The optional
+        <code>backend</code> parameter selects how the window is
+        displayed.  The default value <code>"tk"</code> opens a tkinter
+        window; the value <code>"headless"</code> creates a window that
+        maintains its contents, timers, and event listeners in exactly
+        the same way but displays nothing, which makes it possible to
+        run programs without a display server or without tkinter.  The
+        value <code>"raster"</code> behaves like <code>"headless"</code>
+        but also draws the window into an offscreen image, which is
+        returned by the <code>render</code> method and requires PIL.
+
+        The optional <code>clock</code> parameter selects the clock that
+        drives the timers in the window.  The default value
+        <code>"real"</code> fires timers as time passes; the value
+        <code>"virtual"</code> starts a simulated clock at 0, which
+        advances only through the <code>advance</code>,
+        <code>run_until</code>, and <code>pause</code> methods and fires
+        the timers that come due without waiting for them.
+        """
+        if backend == "headless":
+            tk = _HeadlessRoot(width, height)
+            self._canvas = _HeadlessCanvas(tk, width, height)
+        elif backend == "raster":
+            if _image_model != "PIL":
+                raise ImportError("The raster backend requires the " +
+                                  "Pillow library")
+            tk = _HeadlessRoot(width, height)
+            self._canvas = _RasterCanvas(tk, width, height)
+        elif backend == "tk":
+            try:
+                tk = tkinter._root
+                tk.deiconify()
+            except AttributeError:
+                tk = tkinter.Tk()
+                tkinter._root = tk
+            for w in tk.winfo_children():
+                w.destroy()
+            self._canvas = tkinter.Canvas(tk, width=width, height=height,
+                                          highlightthickness=0,
+                                          background='white')
+        else:
+            raise Exception("Unknown GWindow backend: " + str(backend))
+        if clock not in ("real", "virtual"):
+            raise Exception("Unknown GWindow clock: " + str(clock))
+        self._virtual_clock = clock == "virtual"
+        self._virtual_time = 0
+        self._backend = backend
         self._window_width = width
         self._window_height = height
         self._tk = tk
         self._tk.protocol("WM_DELETE_WINDOW", self._delete_window)
-        for w in tk.winfo_children():
-            w.destroy()
-        self._canvas = tkinter.Canvas(tk, width=width, height=height,
-                                      highlightthickness=0, background='white')
+        _open_roots.append(tk)
         try:
             self._canvas.pack()
         except:
             pass
-        if spyder_flag:
+        if spyder_flag and backend == "tk":
             def cancel_topmost():
                 tk.attributes("-topmost", False)
             tk.attributes("-topmost", True)
@@ -118,9 +181,25 @@ class GWindow(object):
             self._canvas.after(0, cancel_topmost)
         self._canvas.update()
         self._images = { }
-        self._timers = [ ]
+        self._items = { }
+        self._order = None
+        self._batch_depth = 0
+        self._batch_updates = { }
+        self._batch_deletions = [ ]
+        self._batch_rebuild = False
+        if backend != "tk":
+            self._photo_cache = _PhotoCache(factory=_HeadlessPhoto)
+        else:
+            self._photo_cache = _PhotoCache()
+        self._timers = set()
+        self._timer_queue = [ ]
+        self._timer_seq = 0
+        self._frame_id = None
+        self._frame_due = None
+        self._capture = None
         self._base = GCompound()
         self._base._gw = self
+        self._base.set_spatial_index(True)
         self._event_manager = _EventManager(self)
         self.set_window_title(_get_program_name())
         self._event_loop_started = False
@@ -145,10 +224,11 @@ class GWindow(object):
 
     def event_loop(self):
         """
-        Waits for events to happen in the window.
+        Waits for events to happen in the window.  The event loop never
+        advances a virtual clock.
         """
         self._event_loop_started = True
-        tkinter._root.mainloop()
+        self._tk.mainloop()
 
 # Public method: request_focus
 
@@ -158,7 +238,7 @@ class GWindow(object):
         brings it to the top and ensures that key events are delivered to
         the window.
         """
-        tkinter._root.canvas.focus_set()
+        self._canvas.focus_set()
 
 # Public method: clear
 
@@ -217,6 +297,100 @@ class GWindow(object):
         """
         return self._window_title
 
+# Public method: get_backend
+
+    def get_backend(self):
+        """
+        Returns the name of the backend used to display this window,
+        which is one of <code>"tk"</code>, <code>"headless"</code>, or
+        <code>"raster"</code>.
+        """
+        return self._backend
+
+# Public method: render
+
+    def render(self):
+        """
+        Brings the offscreen image of a window that uses the
+        <code>"raster"</code> backend up to date and returns it as a PIL
+        image in RGBA mode.  Only the regions of the window that have
+        changed since the previous call are drawn again.  The same image
+        is updated in place by later calls, so clients that need to keep
+        a frame must copy it.  If render is called inside a batch, the
+        changes recorded so far are applied first.
+        """
+        if self._backend != "raster":
+            raise Exception("render requires a window with the raster " +
+                            "backend")
+        depth = self._batch_depth
+        if depth > 0:
+            self._batch_depth = 0
+            try:
+                self._flush_batch()
+            finally:
+                self._batch_depth = depth
+        return self._canvas.render()
+
+# Public method: start_capture
+
+    def start_capture(self, path, fps=DEFAULT_CAPTURE_FPS,
+                      max_queued=DEFAULT_CAPTURE_QUEUE):
+        """
+        Starts recording the contents of the window at the specified
+        number of frames per second.  If <code>path</code> ends with
+        <code>.gif</code>, the frames are written in order to an animated
+        GIF, which is completed when the capture stops; otherwise,
+        <code>path</code> names a directory that receives the frames as a
+        numbered sequence of PNG files.  Frames are taken from the
+        offscreen image of a window that uses the <code>"raster"</code>
+        backend or from the screen for a tkinter window.  Each frame is
+        copied into a queue that holds at most <code>max_queued</code>
+        frames and is encoded by a pool of background threads.  If the
+        queue is full, the frame is dropped rather than delaying the
+        program.  If a frame cannot be taken or encoded, it is counted as
+        failed, and the first error in taking a frame is reported in the
+        same way as an error in a callback.
+        """
+        if self._backend == "headless":
+            raise Exception("start_capture requires a window that is " +
+                            "displayed or rasterized")
+        if self._capture is not None:
+            self.stop_capture()
+        self._capture = _FrameCapture(self, path, fps, max_queued)
+
+# Public method: stop_capture
+
+    def stop_capture(self):
+        """
+        Stops the capture started by <code>start_capture</code>, waits
+        until every queued frame has been encoded, and returns a
+        <code>GState</code> whose <code>captured</code>,
+        <code>dropped</code>, <code>failed</code>, and <code>written</code>
+        fields count the frames taken from the window, the frames
+        discarded because the queue was full, the frames lost because
+        they could not be taken or encoded, and the frames saved to
+        <code>path</code>.  If no capture is running, the method returns
+        <code>None</code>.
+        """
+        capture = self._capture
+        if capture is None:
+            return None
+        self._capture = None
+        return capture.stop()
+
+# Public method: get_capture_stats
+
+    def get_capture_stats(self):
+        """
+        Returns a <code>GState</code> with the current frame counts of
+        the running capture in the form described for
+        <code>stop_capture</code>, or <code>None</code> if no capture is
+        running.
+        """
+        if self._capture is None:
+            return None
+        return self._capture.get_stats()
+
 # Public method: add
 
     def add(self, gobj, x=None, y=None):
@@ -228,6 +402,16 @@ class GWindow(object):
         """
         self._base.add(gobj, x, y)
 
+# Public method: add_all
+
+    def add_all(self, gobjs):
+        """
+        Adds every <code>GObject</code> in the iterable <code>gobjs</code>
+        to the window, in order from back to front.  The objects keep
+        their current locations.
+        """
+        self._base.add_all(gobjs)
+
 # Public method: remove
 
     def remove(self, gobj):
@@ -245,6 +429,39 @@ class GWindow(object):
         """
         return self._base.get_element_at(x, y)
 
+# Public method: get_elements_at
+
+    def get_elements_at(self, x, y):
+        """
+        Returns a list of every <code>GObject</code> containing the point
+        (x, y), ordered from front to back.
+        """
+        return self._base.get_elements_at(x, y)
+
+# Public method: get_elements_in
+
+    def get_elements_in(self, x, y=None, width=None, height=None):
+        """
+        Returns a list of every <code>GObject</code> whose bounding box
+        intersects the specified rectangle, ordered from front to back.
+        The rectangle may be given either as a <code>GRectangle</code> or
+        as the values x, y, width, and height.
+        """
+        return self._base.get_elements_in(x, y, width, height)
+
+# Public method: raycast
+
+    def raycast(self, x, y, dx, dy, max_dist):
+        """
+        Returns a list of every <code>GObject</code> crossed by the ray
+        from (x, y) in the direction (dx, dy) that extends for the
+        distance <code>max_dist</code>, ordered by the distance at which
+        the ray reaches each object.  An object is crossed if the ray
+        passes through a point for which <code>contains</code> is true,
+        as tested at intervals of half a pixel.
+        """
+        return self._base.raycast(x, y, dx, dy, max_dist)
+
 # Public method: create_timer
 
     def create_timer(self, fn, delay):
@@ -280,20 +497,160 @@ class GWindow(object):
         timer.start()
         return timer
 
+# Public method: get_active_timer_count
+
+    def get_active_timer_count(self):
+        """
+        Returns the number of timers in this window that are currently
+        running.  A one-shot timer stops counting once it has fired, and
+        any timer stops counting once it is stopped, so this value does
+        not grow over the life of a program unless timers are leaked.
+        """
+        return len(self._timers)
+
 # Public method: pause
 
     def pause(self, delay):
         """
         Pauses the current thread for the specified delay, which is
         measured in milliseconds.  The pause method periodically checks
-        the event queue to update the contents of the window.
+        the event queue to update the contents of the window.  If the
+        window uses a virtual clock, pause advances the clock by the
+        delay instead of waiting.
         """
+        if self._virtual_clock:
+            self.advance(delay)
+            self._tk.update_idletasks()
+            self._tk.update()
+            return
         n_cycles = delay // GWindow.MIN_WAKEUP
         for i in range(n_cycles):           # pylint: disable=unused-variable
             self._tk.update_idletasks()
             self._tk.update()
             time.sleep(delay / n_cycles / 1000)
 
+# Public method: get_time
+
+    def get_time(self):
+        """
+        Returns the current time in milliseconds on the clock that drives
+        the timers in this window.  For a virtual clock, this value is the
+        simulated time since the window was created.
+        """
+        return self._get_clock()
+
+# Public method: advance
+
+    def advance(self, delay):
+        """
+        Advances the virtual clock of this window by the specified delay,
+        which is measured in milliseconds, firing every timer that comes
+        due along the way in the order of the times at which they are
+        due.  No time passes in reality.
+        """
+        self._check_virtual_clock("advance")
+        target = self._virtual_time + delay
+        while self._active:
+            due = self._get_next_due()
+            if due is None or due > target:
+                break
+            self._virtual_time = max(due, self._virtual_time)
+            self._run_frame()
+        self._virtual_time = max(target, self._virtual_time)
+
+# Public method: run_until
+
+    def run_until(self, predicate, max_time=None):
+        """
+        Advances the virtual clock of this window from one timer to the
+        next until the function <code>predicate</code> returns
+        <code>True</code>, which is checked before the first timer fires
+        and after each group of timers that fire at the same time.  The
+        method returns <code>True</code> if the predicate is satisfied
+        and <code>False</code> if no timers remain or if the clock would
+        pass the optional limit <code>max_time</code>.
+        """
+        self._check_virtual_clock("run_until")
+        while not predicate():
+            due = self._get_next_due()
+            if due is None or not self._active:
+                return False
+            if max_time is not None and due > max_time:
+                self._virtual_time = max(max_time, self._virtual_time)
+                return False
+            self._virtual_time = max(due, self._virtual_time)
+            self._run_frame()
+        return True
+
+# Public method: begin_batch
+
+    def begin_batch(self):
+        """
+        Starts a batch of changes to the objects in this window.  Until
+        the matching call to <code>commit_batch</code>, changes are
+        recorded on the graphical objects but not sent to the display.
+        Batches may be nested, in which case the changes are applied when
+        the outermost batch is committed.
+        """
+        self._batch_depth += 1
+
+# Public method: commit_batch
+
+    def commit_batch(self):
+        """
+        Ends a batch started by <code>begin_batch</code>.  When the
+        outermost batch is committed, the display is brought up to date
+        in a single pass, so that an object moved many times is moved
+        once and any number of structural changes require at most one
+        rebuild.
+        """
+        if self._batch_depth == 0:
+            raise Exception("commit_batch called without begin_batch")
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._flush_batch()
+
+# Public method: batch
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Returns a context manager that groups the changes made inside a
+        <code>with</code> statement into a single batch, as in
+
+        <pre>
+           with gw.batch():
+               for alien in aliens:
+                   alien.move(dx, 0)
+        </pre>
+        """
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.commit_batch()
+
+# Public method: get_photo_cache_stats
+
+    def get_photo_cache_stats(self):
+        """
+        Returns a <code>GState</code> describing the cache of converted
+        tkinter images used by the <code>GImage</code> objects in this
+        window.  The fields are <code>hits</code>, <code>misses</code>,
+        <code>size</code>, and <code>capacity</code>.
+        """
+        return self._photo_cache.get_stats()
+
+# Public method: set_photo_cache_capacity
+
+    def set_photo_cache_capacity(self, capacity):
+        """
+        Sets the maximum number of converted images kept in the photo
+        cache for this window.  When the cache is full, the least recently
+        used image is discarded.
+        """
+        self._photo_cache.set_capacity(capacity)
+
 # Public static method: exit
 
     @staticmethod
@@ -358,14 +715,23 @@ class GWindow(object):
         Closes the window and exits from the event loop.
         """
         try:
+            if self._capture is not None:
+                self.stop_capture()
             self._active = False
             try:
-                for timer in self._timers:
+                for timer in list(self._timers):
                     timer.stop()
+                if self._frame_id is not None:
+                    self._canvas.after_cancel(self._frame_id)
+                    self._frame_id = None
             except:
                 pass
-            tkinter._root.destroy()
-            del tkinter._root
+            if self._tk in _open_roots:
+                _open_roots.remove(self._tk)
+            self._tk.destroy()
+            if self._backend == "tk":
+                del tkinter._root
+                _decoded_fonts.clear()
         except:
             pass
 
@@ -378,15 +744,359 @@ class GWindow(object):
         if not self._event_loop_started:
             self.event_loop()
 
+# Private method: _get_clock
+
+    def _get_clock(self):
+        """
+        Returns the current time in milliseconds, as used by the timer
+        scheduler.
+        """
+        if self._virtual_clock:
+            return self._virtual_time
+        return time.monotonic() * 1000
+
+# Private method: _check_virtual_clock
+
+    def _check_virtual_clock(self, method):
+        """
+        Raises an exception if this window does not use a virtual clock.
+        """
+        if not self._virtual_clock:
+            raise Exception(method + " requires a window with a " +
+                            "virtual clock")
+
+# Private method: _get_next_due
+
+    def _get_next_due(self):
+        """
+        Returns the time at which the earliest timer in the queue is due,
+        or <code>None</code> if no timer is running.
+        """
+        queue = self._timer_queue
+        while len(queue) > 0 and queue[0][2]._seq != queue[0][1]:
+            heapq.heappop(queue)
+        if len(queue) == 0:
+            return None
+        return queue[0][0]
+
+# Private method: _schedule_timer
+
+    def _schedule_timer(self, timer, due):
+        """
+        Schedules <code>timer</code> to fire at the time <code>due</code>,
+        replacing any earlier schedule for that timer.  Each entry in the
+        queue carries a sequence number, which breaks ties between timers
+        due at the same time and identifies entries made obsolete by a
+        later call to <code>start</code> or <code>stop</code>.
+        """
+        self._timer_seq += 1
+        timer._seq = self._timer_seq
+        timer._due = due
+        self._timers.add(timer)
+        owner = timer._owner
+        if owner is not None:
+            if owner._owned_timers is None:
+                owner._owned_timers = set()
+            owner._owned_timers.add(timer)
+        heapq.heappush(self._timer_queue, (due, timer._seq, timer))
+        self._request_frame()
+
+# Private method: _cancel_timer
+
+    def _cancel_timer(self, timer):
+        """
+        Cancels the schedule for <code>timer</code> and removes it from
+        the set of active timers.  The entry in the queue is discarded
+        when it reaches the front, unless obsolete entries come to
+        outnumber the live ones, in which case the queue is compacted.
+        """
+        timer._seq = 0
+        timer._due = None
+        self._timers.discard(timer)
+        owner = timer._owner
+        if owner is not None and owner._owned_timers is not None:
+            owner._owned_timers.discard(timer)
+        queue = self._timer_queue
+        if len(queue) > 2 * len(self._timers) + 16:
+            queue[:] = [ entry for entry in queue
+                         if entry[2]._seq == entry[1] ]
+            heapq.heapify(queue)
+
+# Private method: _request_frame
+
+    def _request_frame(self):
+        """
+        Ensures that a single tkinter callback is pending for the earliest
+        timer in the queue.
+        """
+        due = self._get_next_due()
+        if due is None or not self._active or self._virtual_clock:
+            return
+        if self._frame_id is not None:
+            if self._frame_due <= due:
+                return
+            self._canvas.after_cancel(self._frame_id)
+        delay = max(0, math.ceil(due - self._get_clock()))
+        self._frame_due = due
+        self._frame_id = self._canvas.after(delay, self._run_frame)
+
+# Private method: _run_frame
+
+    def _run_frame(self):
+        """
+        Fires every timer that is due, in order of the time at which each
+        is due.  Each callback changes the canvas directly, just as it
+        would if it were called from a tkinter <code>after</code> callback;
+        a callback that makes many changes can group them by calling
+        <code>batch</code> itself.  While its callback runs, a timer is
+        marked with the sequence number -1, so that a call to
+        <code>start</code> or <code>stop</code> from the callback takes
+        precedence over the automatic repetition.  Timers that are started
+        by these callbacks are not considered until the next frame.  An
+        interval timer is rescheduled relative to the time at which it was
+        due, so that it does not drift; if it has fallen a full interval
+        behind, it is rescheduled relative to the current time instead.
+        """
+        self._frame_id = None
+        now = self._get_clock()
+        queue = self._timer_queue
+        due_entries = [ ]
+        while len(queue) > 0 and queue[0][0] <= now:
+            due_entries.append(heapq.heappop(queue))
+        for due, seq, timer in due_entries:
+            if timer._seq != seq:
+                continue
+            timer._seq = -1
+            timer._due = None
+            try:
+                timer._fn()
+            except Exception:
+                self._cancel_timer(timer)
+                self._tk.report_callback_exception(*sys.exc_info())
+                continue
+            if timer._seq == -1:
+                self._cancel_timer(timer)
+                if timer._repeats and self._active:
+                    due += timer._delay
+                    if due <= now:
+                        due = now + timer._delay
+                    self._schedule_timer(timer, due)
+        self._request_frame()
+
 # Private method: _rebuild
 
     def _rebuild(self):
         """
         Rebuilds the tkinter data structure for the window.  This
-        operation is triggered if a global update is necessary.
+        operation is triggered if a global update is necessary.  Rather
+        than deleting every item and starting over, the rebuild walks the
+        scene graph, reuses the items that already exist, issues calls
+        only for the items whose appearance has changed, deletes the
+        items whose objects are no longer in the window, and finally
+        restores the stacking order.  Inside a batch, the rebuild is
+        deferred until the batch is committed.
+        """
+        if self._batch_depth > 0:
+            self._batch_rebuild = True
+            return
+        tkc = self._canvas
+        self._order = [ ]
+        try:
+            self._base._install(self, _IDENTITY_TRANSFORM)
+            order = self._order
+        finally:
+            self._order = None
+        if len(order) != len(self._items):
+            installed = set(order)
+            for tkid in list(self._items):
+                if tkid not in installed:
+                    tkc.delete(tkid)
+                    self._items[tkid]._tkid = None
+                    del self._items[tkid]
+        self._restack(order)
+
+# Private method: _restack
+
+    def _restack(self, order):
+        """
+        Reorders the items on the canvas so that they match the order
+        given by the list of item ids, from back to front.  The items
+        that lie on the longest subsequence already in the correct
+        relative order stay where they are; each of the others is
+        raised to sit just above its predecessor.
+        """
+        tkc = self._canvas
+        current = tkc.find_all()
+        if len(current) == len(order) and list(current) == order:
+            return
+        position = { }
+        for i, tkid in enumerate(current):
+            position[tkid] = i
+        keep = _longest_increasing_subsequence([ position[tkid]
+                                                  for tkid in order ])
+        prev = None
+        for i, tkid in enumerate(order):
+            if i not in keep:
+                if prev is None:
+                    tkc.tag_lower(tkid)
+                else:
+                    tkc.tag_raise(tkid, prev)
+            prev = tkid
+
+# Private method: _install_item
+
+    def _install_item(self, gobj, kind, coords, options):
+        """
+        Ensures that the canvas contains an item of the specified kind for
+        <code>gobj</code> with the given coordinates and options.  If the
+        object already has a matching item, only the coordinates and the
+        options that differ from the last ones applied are updated.
+        """
+        tkc = self._canvas
+        tkid = gobj._tkid
+        spec = gobj._tkspec
+        reuse = (tkid is not None and self._items.get(tkid) is gobj and
+                 spec[0] == kind)
+        if reuse:
+            old_options = spec[2]
+            for key in old_options:
+                if key not in options:
+                    reuse = False
+                    break
+        if reuse:
+            if spec[1] != coords:
+                tkc.coords(tkid, *coords)
+            changes = { }
+            for key, value in options.items():
+                if key not in old_options or old_options[key] != value:
+                    changes[key] = value
+            if len(changes) > 0:
+                tkc.itemconfig(tkid, **changes)
+        else:
+            create = getattr(tkc, "create_" + kind)
+            gobj._tkid = create(*coords, **options)
+            self._items[gobj._tkid] = gobj
+            if tkid is not None and self._items.get(tkid) is gobj:
+                tkc.tag_raise(gobj._tkid, tkid)
+                tkc.delete(tkid)
+                del self._items[tkid]
+        gobj._tkspec = (kind, coords, options)
+        if self._order is not None:
+            self._order.append(gobj._tkid)
+
+# Private method: _defer_update
+
+    def _defer_update(self, gobj):
+        """
+        Returns <code>True</code> if updates to the canvas are currently
+        deferred, in which case <code>gobj</code> is recorded so that its
+        item can be brought up to date when the batch is committed.
+        """
+        if self._batch_depth == 0:
+            return False
+        self._batch_updates[gobj] = True
+        return True
+
+# Private method: _flush_batch
+
+    def _flush_batch(self):
+        """
+        Applies the changes recorded during a batch.  Deleted items are
+        removed in a single call.  If any structural change occurred, one
+        rebuild brings the whole canvas up to date; otherwise, each
+        modified object is reinstalled once, which applies only the net
+        change to its item.
+        """
+        updates = self._batch_updates
+        deletions = self._batch_deletions
+        rebuild = self._batch_rebuild
+        self._batch_updates = { }
+        self._batch_deletions = [ ]
+        self._batch_rebuild = False
+        if len(deletions) > 0:
+            self._canvas.delete(*deletions)
+        if rebuild:
+            self._rebuild()
+        else:
+            for gobj in updates:
+                gobj._flush_update(self)
+
+# Private method: _move_item
+
+    def _move_item(self, gobj, dx, dy):
+        """
+        Moves the item for <code>gobj</code> by the displacements
+        <code>dx</code> and <code>dy</code>.  The recorded coordinates
+        are discarded so that the next rebuild resets them.
+        """
+        self._canvas.move(gobj._tkid, dx, dy)
+        kind, coords, options = gobj._tkspec
+        gobj._tkspec = (kind, None, options)
+
+# Private method: _move_group
+
+    def _move_group(self, gcomp, dx, dy):
+        """
+        Moves every item installed for the components of the compound
+        <code>gcomp</code> by the displacements <code>dx</code> and
+        <code>dy</code> using the tag shared by those items.
+        """
+        self._canvas.move(gcomp._tag, dx, dy)
+        gcomp._reposition(gcomp._ctm_base)
+
+# Private method: _delete_group
+
+    def _delete_group(self, gcomp):
+        """
+        Deletes every item installed for the components of the compound
+        <code>gcomp</code> in a single call.  The items of the top-level
+        compound are all the items on the canvas.  Inside a batch, the
+        deletion is deferred until the batch is committed.
+        """
+        if gcomp is self._base:
+            tag = "all"
+        else:
+            tag = gcomp._tag
+        if self._batch_depth > 0:
+            self._batch_deletions.append(tag)
+        else:
+            self._canvas.delete(tag)
+
+# Private method: _raise_items
+
+    def _raise_items(self, tag, tkid):
+        """
+        Moves the items identified by <code>tag</code> so that they sit
+        just above the item <code>tkid</code>, keeping their relative
+        order.
+        """
+        self._canvas.tag_raise(tag, tkid)
+
+# Private method: _lower_items
+
+    def _lower_items(self, tag, tkid):
+        """
+        Moves the items identified by <code>tag</code> so that they sit
+        just below the item <code>tkid</code>, keeping their relative
+        order.
         """
-        self._canvas.delete("all")
-        self._base._install(self, _GTransform())
+        self._canvas.tag_lower(tag, tkid)
+
+# Private method: _delete_item
+
+    def _delete_item(self, gobj):
+        """
+        Deletes the item for <code>gobj</code> from the canvas.  Inside a
+        batch, the deletion is deferred until the batch is committed.
+        """
+        if self._batch_depth > 0:
+            self._batch_deletions.append(gobj._tkid)
+        else:
+            self._canvas.delete(gobj._tkid)
+        if self._items.get(gobj._tkid) is gobj:
+            del self._items[gobj._tkid]
+        gobj._tkid = None
+        gobj._tkspec = None
 
 # Define camel-case names
 
@@ -395,17 +1105,31 @@ class GWindow(object):
     getWidth = get_width
     getHeight = get_height
     addEventListener = add_event_listener
+    addAll = add_all
     setWindowTitle = set_window_title
     getWindowTitle = get_window_title
+    getBackend = get_backend
     getElementAt = get_element_at
+    getElementsAt = get_elements_at
+    getElementsIn = get_elements_in
     createTimer = create_timer
     setTimeout = set_timeout
     setInterval = set_interval
+    getActiveTimerCount = get_active_timer_count
     getProgramName = get_program_name
     getScreenWidth = get_screen_width
     getScreenHeight = get_screen_height
     convertColorToRGB = convert_color_to_rgb
     convertRGBToColor = convert_rgb_to_color
+    beginBatch = begin_batch
+    commitBatch = commit_batch
+    getPhotoCacheStats = get_photo_cache_stats
+    getTime = get_time
+    startCapture = start_capture
+    stopCapture = stop_capture
+    getCaptureStats = get_capture_stats
+    runUntil = run_until
+    setPhotoCacheCapacity = set_photo_cache_capacity
 
 # Allow British spelling
 
@@ -440,7 +1164,14 @@ class GObject(object):
         self._visible = True
         self._parent = None
         self._tkid = None
+        self._tkspec = None
+        self._ctm_base = None
+        self._zkey = 0
         self._gw = None
+        self._target = None
+        self._item_x = 0
+        self._item_y = 0
+        self._owned_timers = None
 
 # Public method: get_x
 
@@ -479,6 +1210,7 @@ class GObject(object):
         self._x = x
         self._y = y
         self._update_location()
+        self._bounds_changed()
 
 # Public method: move
 
@@ -554,8 +1286,7 @@ class GObject(object):
         <code>gg</code>, and <code>bb</code> are pairs of hexadecimal digits
         indicating the red, green, and blue components of the color.
         """
-        rgb = _convert_color_to_rgb(color)
-        self._color = _convert_rgb_to_color(rgb)
+        self._color = _decode_color(color)
         self._update_color()
 
 # Public method: get_color
@@ -586,6 +1317,7 @@ class GObject(object):
         """
         self._angle += theta
         self._update_rotation()
+        self._bounds_changed()
 
 # Public method: set_visible
 
@@ -654,14 +1386,14 @@ class GObject(object):
 
 # Public method: contains
 
-    def contains(self, x, y):
+    def contains(self, x, y=None):
         """
-        Returns true if the specified point is inside the object.
+        Returns true if the specified point is inside the object.  The
+        point may also be given as a <code>GPoint</code> or as a
+        dictionary with the keys <code>"x"</code> and <code>"y"</code>.
         """
-        if isinstance(x, GPoint):
-            x, y = x.get_x(), x.get_y()
-        elif isinstance(x, dict):
-            x, y = x.x, x.y
+        if y is None:
+            x, y = _get_point_coords(x)
         bounds = self.get_bounds()
         if bounds is None:
             return False
@@ -681,6 +1413,39 @@ class GObject(object):
         """
         return self._parent
 
+# Public method: set_timeout
+
+    def set_timeout(self, fn, delay, keep_alive=False):
+        """
+        Creates and starts a one-shot timer that calls fn after the
+        specified delay, which is measured in milliseconds.  The timer
+        belongs to this object and is stopped automatically if the object
+        is removed from its window before the timer fires, unless the
+        optional <code>keep_alive</code> parameter is <code>True</code>.
+        The object must already be installed in a window.  The
+        set_timeout method returns the <code>GTimer</code> object.
+        """
+        timer = self._create_owned_timer(fn, delay, keep_alive)
+        timer.start()
+        return timer
+
+# Public method: set_interval
+
+    def set_interval(self, fn, delay, keep_alive=False):
+        """
+        Creates and starts an interval timer that calls fn after the
+        specified delay, which is measured in milliseconds.  The timer
+        belongs to this object and is stopped automatically when the
+        object is removed from its window, unless the optional
+        <code>keep_alive</code> parameter is <code>True</code>.  The object
+        must already be installed in a window.  The set_interval method
+        returns the <code>GTimer</code> object.
+        """
+        timer = self._create_owned_timer(fn, delay, keep_alive)
+        timer.set_repeats(True)
+        timer.start()
+        return timer
+
 # Abstract method: get_type
 
     def get_type(self):
@@ -712,34 +1477,103 @@ class GObject(object):
         Updates the specified properties of the object, if it is installed
         in a window.
         """
-        gw = self._get_window()
-        if gw is None:
+        if self._tkid is None:
+            return
+        gw = self._target
+        if gw._defer_update(self):
             return
         tkc = gw._canvas
         tkc.itemconfig(self._tkid, **options)
+        self._tkspec[2].update(options)
+
+# Protected method: _update_item
+
+    def _update_item(self):
+        """
+        Recomputes the tkinter item for this object from its current
+        state, updating only what has changed.  This method is used when
+        a change affects more than the location or a single property.
+        """
+        if self._tkid is None:
+            return
+        gw = self._target
+        if gw._defer_update(self):
+            return
+        self._install(gw, self._ctm_base)
+
+# Protected method: _bounds_changed
+
+    def _bounds_changed(self):
+        """
+        Informs the enclosing <code>GCompound</code> that the bounds of
+        this object may have changed.  Every method that changes the
+        location, size, or shape of an object must call this method.
+        """
+        if self._parent is not None:
+            self._parent._child_bounds_changed(self)
 
 # Protected method: _update_location
 
     def _update_location(self):
         """
         Updates the location for this object from the stored x and y
-        values.  Some subclasses need to override this method.
-        """
-        gw = self._get_window()
-        if gw is None:
+        values.  An installed object records the window in which it is
+        installed, the transformation of its enclosing compound, and the
+        location at which its item was last placed.  Because moving an
+        object displaces every point of its item by the same amount, the
+        displacement on the canvas is computed from these values alone
+        and applied in a single call, with no need to read the item's
+        coordinates or to walk the chain of enclosing compounds.
+        """
+        if self._tkid is None:
             return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        offx = 0
-        offy = 0
-        gobj = self.get_parent()
-        while gobj is not None:
-            offx += gobj._x
-            offy += gobj._y
-            gobj = gobj.get_parent()
-        dx = (self._x + offx) - coords[0]
-        dy = (self._y + offy) - coords[1]
-        tkc.move(self._tkid, dx, dy)
+        gw = self._target
+        if gw._defer_update(self):
+            return
+        dx, dy = self._get_displacement()
+        self._item_x = self._x
+        self._item_y = self._y
+        if dx != 0 or dy != 0:
+            gw._move_item(self, dx, dy)
+
+# Private method: _get_displacement
+
+    def _get_displacement(self):
+        """
+        Returns the displacement on the canvas of the item for this object
+        since the item was last placed.  The location of most objects is
+        transformed along with their coordinates by the enclosing
+        compound, so the displacement is rotated and scaled as well.
+        """
+        return self._ctm_base._transform_vector(self._x - self._item_x,
+                                                self._y - self._item_y)
+
+# Private method: _get_item_tag
+
+    def _get_item_tag(self):
+        """
+        Returns the id or tag that identifies every item installed for
+        this object on the canvas.
+        """
+        return self._tkid
+
+# Private method: _get_first_item
+
+    def _get_first_item(self):
+        """
+        Returns the id of the backmost item installed for this object, or
+        <code>None</code> if the object has no items.
+        """
+        return self._tkid
+
+# Private method: _get_last_item
+
+    def _get_last_item(self):
+        """
+        Returns the id of the frontmost item installed for this object,
+        or <code>None</code> if the object has no items.
+        """
+        return self._tkid
 
 # Protected method: _update_color
 
@@ -748,7 +1582,16 @@ class GObject(object):
         Updates the color properties.  Some subclasses need to override
         this method.
         """
-        self._update_properties(fill=self._color)
+        self._update_properties(**self._get_color_options())
+
+# Protected method: _get_color_options
+
+    def _get_color_options(self):
+        """
+        Returns a dictionary of the tkinter options that determine the
+        color of this object.  Some subclasses need to override this method.
+        """
+        return { "fill": self._color }
 
 # Protected method: _update_visible
 
@@ -757,9 +1600,9 @@ class GObject(object):
         Updates the visible property.
         """
         if self._visible:
-            self._update_properties(state=tkinter.NORMAL)
+            self._update_properties(state="normal")
         else:
-            self._update_properties(state=tkinter.HIDDEN)
+            self._update_properties(state="hidden")
 
 # Protected method: _update_rotation
 
@@ -783,14 +1626,121 @@ class GObject(object):
             gobj = gobj._parent
         return gobj._gw
 
-# Private abstract method: _install
+# Private method: _create_owned_timer
+
+    def _create_owned_timer(self, fn, delay, keep_alive):
+        """
+        Creates a timer in the window containing this object and, unless
+        <code>keep_alive</code> is set, records this object as its owner.
+        """
+        gw = self._get_window()
+        if gw is None:
+            raise Exception("Timers require the object to be in a window")
+        timer = GTimer(gw, fn, delay)
+        if not keep_alive:
+            timer._owner = self
+        return timer
+
+# Private method: _stop_timers
+
+    def _stop_timers(self):
+        """
+        Stops every running timer owned by this object.
+        """
+        if self._owned_timers is not None:
+            for timer in list(self._owned_timers):
+                timer.stop()
+
+# Private method: _install
 
     def _install(self, target, ctm):
         """
         Installs the object in the target, creating any tkinter objects
-        that are necessary.
+        that are necessary.  If the object has already been installed,
+        its existing item is updated to match the current state.
         """
-        raise Exception("_install is not defined in the GObject class")
+        self._ctm_base = ctm
+        self._target = target
+        self._item_x = self._x
+        self._item_y = self._y
+        kind, coords, options = self._create_item_spec(target, ctm)
+        if self._visible:
+            options["state"] = "normal"
+        else:
+            options["state"] = "hidden"
+        if self._parent is not None and len(self._parent._tags) > 0:
+            options["tags"] = self._parent._tags
+        target._install_item(self, kind, coords, options)
+
+# Private method: _reposition
+
+    def _reposition(self, ctm):
+        """
+        Records a new transformation for the enclosing compound after its
+        items have been moved on the canvas.  The recorded coordinates
+        are discarded so that the next reinstallation resets them.
+        """
+        self._ctm_base = ctm
+        if self._tkspec is not None:
+            kind, coords, options = self._tkspec
+            self._tkspec = (kind, None, options)
+
+# Private method: _flush_update
+
+    def _flush_update(self, gw):
+        """
+        Brings the item for this object up to date after a batch.
+        """
+        tkid = self._tkid
+        if tkid is not None and gw._items.get(tkid) is self:
+            self._install(gw, self._ctm_base)
+
+# Private abstract method: _create_item_spec
+
+    def _create_item_spec(self, target, ctm):
+        """
+        Returns a tuple consisting of the kind of tkinter item used to
+        display this object, its coordinates, and a dictionary of its
+        options, given the transformation of the enclosing compound.
+        """
+        raise Exception("_create_item_spec is not defined in the " +
+                        "GObject class")
+
+# Private method: _uninstall
+
+    def _uninstall(self, target):
+        """
+        Deletes the tkinter objects created when this object was installed
+        in the target.  The stacking order of the remaining objects is
+        unaffected, so no rebuild is required.
+        """
+        if self._tkid is not None:
+            target._delete_item(self)
+        self._release()
+
+# Private method: _forget_items
+
+    def _forget_items(self, target):
+        """
+        Discards the record of the items for this object after they have
+        been deleted from the canvas as part of a group.
+        """
+        tkid = self._tkid
+        if tkid is not None:
+            if target._items.get(tkid) is self:
+                del target._items[tkid]
+            self._tkid = None
+            self._tkspec = None
+        self._release()
+
+# Private method: _release
+
+    def _release(self):
+        """
+        Releases any resources held only to display this object, which
+        are no longer needed once it has been removed from the window.
+        """
+        pass
 
 # Define camel-case names
 
@@ -813,6 +1763,8 @@ class GObject(object):
     sendBackward = send_backward
     sendToBack = send_to_back
     getParent = get_parent
+    setTimeout = set_timeout
+    setInterval = set_interval
 
 # Allow British spelling
 
@@ -863,8 +1815,7 @@ class GFillableObject(GObject):
         """
         Sets the color used to display the filled region of the object.
         """
-        rgb = _convert_color_to_rgb(color)
-        self._fill_color = _convert_rgb_to_color(rgb)
+        self._fill_color = _decode_color(color)
         self._update_color()
 
 # Public method: get_fill_color
@@ -877,11 +1828,11 @@ class GFillableObject(GObject):
         """
         return self._fill_color
 
-# Override method: _update_color
+# Override method: _get_color_options
 
-    def _update_color(self):
+    def _get_color_options(self):
         """
-        Updates the color properties for a <code>GFillableObject</code>.
+        Returns the color options for a <code>GFillableObject</code>.
         """
         outline = self._color
         if self._fill_flag:
@@ -890,7 +1841,7 @@ class GFillableObject(GObject):
                 fill = outline
         else:
             fill = ""
-        self._update_properties(outline=outline, fill=fill)
+        return { "outline": outline, "fill": fill }
 
 # Define camel-case names
 
@@ -954,13 +1905,8 @@ class GRect(GFillableObject):
             width, height = width.get_width(), width.get_height()
         self._width = width
         self._height = height
-        gw = self._get_window()
-        if gw is None:
-            return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        tkc.coords(self._tkid, coords[0], coords[1],
-                   coords[0] + width, coords[1] + height)
+        self._update_item()
+        self._bounds_changed()
 
 # Public method: set_bounds
 
@@ -982,6 +1928,37 @@ class GRect(GFillableObject):
         """
         return GRectangle(self._x, self._y, self._width, self._height)
 
+# Override method: get_width
+
+    def get_width(self):
+        """
+        Returns the width of this <code>GRect</code>.
+        """
+        return self._width
+
+# Override method: get_height
+
+    def get_height(self):
+        """
+        Returns the height of this <code>GRect</code>.
+        """
+        return self._height
+
+# Override method: contains
+
+    def contains(self, x, y=None):
+        """
+        Returns true if the specified point is inside the object.  The
+        test uses the stored fields directly, so that hit testing does
+        not allocate a bounding rectangle.
+        """
+        if y is None:
+            x, y = _get_point_coords(x)
+        x0 = self._x
+        y0 = self._y
+        return (x >= x0 and y >= y0 and
+                x < x0 + self._width and y < y0 + self._height)
+
 # Override method: get_type
 
     def get_type(self):
@@ -990,29 +1967,28 @@ class GRect(GFillableObject):
         """
         return "GRect"
 
-# Override method: _install
+# Override method: _create_item_spec
 
-    def _install(self, target, ctm):
+    def _create_item_spec(self, target, ctm):
         """
-        Installs the <code>GRect</code> in the canvas.
+        Returns the tkinter item specification for the <code>GRect</code>.
         """
-        gw = target
-        tkc = gw._canvas
-        self._ctm_base = ctm
-        lctm = _GTransform(rotation=self._angle + ctm._rotation,
-                           sf=self._sf * ctm._sf)
+        rotation = self._angle + ctm._rotation
         p0 = ctm.transform(self._x, self._y)
-        if lctm._rotation == 0:
+        if rotation == 0:
             self._rep = "Rectangle"
             p1 = ctm.transform(self._x + self._width, self._y + self._height)
-            self._tkid = tkc.create_rectangle(p0._x, p0._y, p1._x, p1._y,
-                                              width=self._line_width)
+            kind = "rectangle"
+            coords = [ p0._x, p0._y, p1._x, p1._y ]
         else:
             self._rep = "Polygon"
+            kind = "polygon"
+            lctm = _GTransform(rotation=rotation, sf=self._sf * ctm._sf)
             coords = self._create_rect_coords(p0._x, p0._y,
                                               self._width, self._height, lctm)
-            self._tkid = tkc.create_polygon(*coords, width=self._line_width)
-        self._update_color()
+        options = self._get_color_options()
+        options["width"] = self._line_width
+        return kind, coords, options
 
 # Override method: _update_rotation
 
@@ -1020,20 +1996,7 @@ class GRect(GFillableObject):
         """
         Updates the points for this <code>GRect</code> after a rotation.
         """
-        gw = self._get_window()
-        if gw is not None:
-            if self._rep == "Rectangle":
-                gw._rebuild()
-            else:
-                tkc = gw._canvas
-                ctm = self._ctm_base
-                lctm = _GTransform(rotation=self._angle + ctm._rotation,
-                                   sf=self._sf * ctm._sf)
-                p0 = ctm.transform(self._x, self._y)
-                coords = self._create_rect_coords(p0._x, p0._y,
-                                                  self._width, self._height,
-                                                  lctm)
-                tkc.coords(self._tkid, *coords)
+        self._update_item()
 
 # Private method: _create_rect_coords
 
@@ -1107,13 +2070,8 @@ class GOval(GFillableObject):
             width, height = width.get_width(), width.get_height()
         self._width = width
         self._height = height
-        gw = self._get_window()
-        if gw is None:
-            return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        tkc.coords(self._tkid, coords[0], coords[1],
-                   coords[0] + width, coords[1] + height)
+        self._update_item()
+        self._bounds_changed()
 
 # Public method: set_bounds
 
@@ -1135,11 +2093,34 @@ class GOval(GFillableObject):
         """
         return GRectangle(self._x, self._y, self._width, self._height)
 
+# Override method: get_width
+
+    def get_width(self):
+        """
+        Returns the width of this <code>GOval</code>.
+        """
+        return self._width
+
+# Override method: get_height
+
+    def get_height(self):
+        """
+        Returns the height of this <code>GOval</code>.
+        """
+        return self._height
+
 # Override method: contains
 
-    def contains(self, x, y):
+    def contains(self, x, y=None):
+        """
+        Returns true if the specified point is inside the object.
+        """
+        if y is None:
+            x, y = _get_point_coords(x)
         rx = self._width / 2
         ry = self._height / 2
+        if rx == 0 or ry == 0:
+            return False
         tx = x - (self._x + rx)
         ty = y - (self._y + ry)
         return (tx * tx) / (rx * rx) + (ty * ty) / (ry * ry) <= 1.0
@@ -1152,31 +2133,29 @@ class GOval(GFillableObject):
         """
         return "GOval"
 
-# Override method: _install
+# Override method: _create_item_spec
 
-    def _install(self, target, ctm):
+    def _create_item_spec(self, target, ctm):
         """
-        Installs the <code>GOval</code> in the canvas.
+        Returns the tkinter item specification for the <code>GOval</code>.
         """
-        gw = target
-        tkc = gw._canvas
-        self._ctm_base = ctm
-        lctm = _GTransform(rotation=self._angle + ctm._rotation,
-                           sf=self._sf * ctm._sf)
+        rotation = self._angle + ctm._rotation
         p0 = ctm.transform(self._x, self._y)
-        if lctm._rotation == 0:
+        options = self._get_color_options()
+        options["width"] = self._line_width
+        if rotation == 0:
             self._rep = "Oval"
-            lctm = ctm.compose(_GTransform(sf=self._sf))
             p1 = ctm.transform(self._x + self._width, self._y + self._height)
-            self._tkid = tkc.create_oval(p0._x, p0._y, p1._x, p1._y,
-                                         width=self._line_width)
+            kind = "oval"
+            coords = [ p0._x, p0._y, p1._x, p1._y ]
         else:
             self._rep = "Polygon"
+            kind = "polygon"
+            lctm = _GTransform(rotation=rotation, sf=self._sf * ctm._sf)
             coords = self._create_oval_coords(p0._x, p0._y,
                                               self._width, self._height, lctm)
-            self._tkid = tkc.create_polygon(*coords, width=self._line_width,
-                                            smooth=1)
-        self._update_color()
+            options["smooth"] = 1
+        return kind, coords, options
 
 # Override method: _update_rotation
 
@@ -1184,20 +2163,7 @@ class GOval(GFillableObject):
         """
         Updates the points for this <code>GOval</code> after a rotation.
         """
-        gw = self._get_window()
-        if gw is not None:
-            if self._rep == "Oval":
-                gw._rebuild()
-            else:
-                tkc = gw._canvas
-                ctm = self._ctm_base
-                lctm = _GTransform(rotation=self._angle + ctm._rotation,
-                                   sf=self._sf * ctm._sf)
-                p0 = ctm.transform(self._x, self._y)
-                coords = self._create_oval_coords(p0._x, p0._y,
-                                                  self._width, self._height,
-                                                  lctm)
-                tkc.coords(self._tkid, *coords)
+        self._update_item()
 
 # Private method: _create_oval_coords
 
@@ -1239,6 +2205,8 @@ class GCompound(GObject):
     to that location.
     """
 
+    _tag_count = 0
+
 # Constructor: GCompound
 
     def __init__(self):
@@ -1246,7 +2214,14 @@ class GCompound(GObject):
         Creates a <code>GCompound</code> with no internal components.
         """
         GObject.__init__(self)
-        self._contents = [ ]
+        self._contents = _GComponentList()
+        self._index = None
+        self._top_zkey = 0
+        self._bottom_zkey = 0
+        GCompound._tag_count += 1
+        self._tag = "GCompound" + str(GCompound._tag_count)
+        self._tags = ()
+        self._reinstall_pending = False
 
 # Public method: add
 
@@ -1261,12 +2236,54 @@ class GCompound(GObject):
             gobj.set_location(x, y)
         self._contents.append(gobj)
         gobj._parent = self
-        if self._gw is None:
+        gobj._zkey = self._top_zkey
+        self._top_zkey += 1
+        if self._gw is None or self._gw._batch_depth > 0:
             gw = self._get_window()
             if gw is not None:
                 gw._rebuild()
         else:
-            gobj._install(self._gw, _GTransform())
+            gobj._install(self._gw, _IDENTITY_TRANSFORM)
+        if self._index is not None:
+            self._index.add(gobj)
+        self._bounds_changed()
+
+# Public method: add_all
+
+    def add_all(self, gobjs):
+        """
+        Adds every graphical object in the iterable <code>gobjs</code> to
+        the <code>GCompound</code>, in order from back to front.  The
+        objects keep their current locations.  The new objects are
+        installed in a single pass after all of them have been added, so
+        that a compound nested within the window is rebuilt at most once.
+        If any of the objects already belongs to a <code>GCompound</code>
+        or appears more than once, none of the objects is added.
+        """
+        added = list(gobjs)
+        ids = set()
+        for gobj in added:
+            if gobj._parent is not None or id(gobj) in ids:
+                raise Exception("add_all: " + str(gobj) +
+                                " is already in a GCompound")
+            ids.add(id(gobj))
+        if len(added) == 0:
+            return
+        for gobj in added:
+            self._contents.append(gobj)
+            gobj._parent = self
+            gobj._zkey = self._top_zkey
+            self._top_zkey += 1
+            if self._index is not None:
+                self._index.add(gobj)
+        if self._gw is None or self._gw._batch_depth > 0:
+            gw = self._get_window()
+            if gw is not None:
+                gw._rebuild()
+        else:
+            for gobj in added:
+                gobj._install(self._gw, _IDENTITY_TRANSFORM)
+        self._bounds_changed()
 
 # Public method: remove
 
@@ -1274,24 +2291,35 @@ class GCompound(GObject):
         """
         Removes the specified object from the <code>GCompound</code>.
         """
-        index = self._find_gobject(gobj)
-        if index != -1:
-            self._remove_at(index)
-        gw = self._get_window()
-        if gw is not None:
-            gw._rebuild()
+        if gobj in self._contents:
+            gw = self._get_window()
+            if gw is not None:
+                gobj._uninstall(gw)
+                gobj._stop_timers()
+            self._remove_component(gobj)
+            self._bounds_changed()
 
 # Public method: remove_all
 
     def remove_all(self):
         """
         Removes all graphical objects from the <code>GCompound</code>.
+        The components are detached in a single pass, and their items are
+        deleted from the canvas with one call using the tag of the
+        compound.
         """
-        while len(self._contents) > 0:
-            self._remove_at(0)
         gw = self._get_window()
         if gw is not None:
-            gw._rebuild()
+            gw._delete_group(self)
+        for gobj in self._contents:
+            if gw is not None:
+                gobj._forget_items(gw)
+                gobj._stop_timers()
+            gobj._parent = None
+        self._contents = _GComponentList()
+        if self._index is not None:
+            self._index = _GSpatialIndex(self._index._cell_size)
+        self._bounds_changed()
 
 # Public method: get_element_at
 
@@ -1301,11 +2329,119 @@ class GCompound(GObject):
         point (x, y), or <code>None</code> if no such object exists.
         Coordinates are interpreted relative to the reference point.
         """
+        if self._index is not None:
+            return self._index.find_top(x, y)
         for gobj in reversed(self._contents):
             if gobj.contains(x, y):
                 return gobj
         return None
 
+# Public method: set_spatial_index
+
+    def set_spatial_index(self, flag, cell_size=None):
+        """
+        Determines whether this <code>GCompound</code> maintains a spatial
+        index of its components.  The index divides the plane into square
+        cells of the specified size and records which components overlap
+        each cell, which allows <code>get_element_at</code> to examine
+        only the components near the point rather than every component.
+        The results are the same with or without the index.
+        """
+        if flag:
+            if cell_size is None:
+                cell_size = _GSpatialIndex.DEFAULT_CELL_SIZE
+            self._index = _GSpatialIndex(cell_size)
+            for gobj in self._contents:
+                self._index.add(gobj)
+        else:
+            self._index = None
+
+# Public method: has_spatial_index
+
+    def has_spatial_index(self):
+        """
+        Returns <code>True</code> if this <code>GCompound</code> maintains
+        a spatial index of its components.
+        """
+        return self._index is not None
+
+# Public method: get_elements_at
+
+    def get_elements_at(self, x, y):
+        """
+        Returns a list of every <code>GObject</code> containing the point
+        (x, y), ordered from front to back in the <i>z</i> dimension.
+        Coordinates are interpreted relative to the reference point.
+        """
+        if self._index is not None:
+            return self._index.find_all(x, y)
+        result = [ ]
+        for gobj in reversed(self._contents):
+            if gobj.contains(x, y):
+                result.append(gobj)
+        return result
+
+# Public method: get_elements_in
+
+    def get_elements_in(self, x, y=None, width=None, height=None):
+        """
+        Returns a list of every <code>GObject</code> whose bounding box
+        intersects the specified rectangle, ordered from front to back in
+        the <i>z</i> dimension.  The rectangle may be given either as a
+        <code>GRectangle</code> or as the values x, y, width, and height.
+        Coordinates are interpreted relative to the reference point.
+        """
+        if isinstance(x, GRectangle):
+            width, height = x.get_width(), x.get_height()
+            x, y = x.get_x(), x.get_y()
+        x1 = x + width
+        y1 = y + height
+        if self._index is not None:
+            return self._index.find_in(x, y, x1, y1)
+        result = [ ]
+        for gobj in reversed(self._contents):
+            bounds = gobj.get_bounds()
+            if bounds is not None:
+                if (bounds._x <= x1 and x <= bounds._x + bounds._width and
+                        bounds._y <= y1 and y <= bounds._y + bounds._height):
+                    result.append(gobj)
+        return result
+
+# Public method: raycast
+
+    def raycast(self, x, y, dx, dy, max_dist):
+        """
+        Returns a list of every <code>GObject</code> crossed by the ray
+        that starts at (x, y), points in the direction (dx, dy), and
+        extends for the distance <code>max_dist</code>.  The bounding box
+        of each object limits the part of the ray that is examined, and
+        the object is crossed if the ray passes through a point for which
+        <code>contains</code> is true, as tested at intervals of half a
+        pixel.  This is the same test used by <code>get_element_at</code>.
+        The objects are ordered by the distance at which the ray reaches
+        them; objects reached at the same distance are ordered from front
+        to back.  Coordinates are interpreted relative to the reference
+        point.
+        """
+        length = math.sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return self.get_elements_at(x, y)
+        ux = dx / length
+        uy = dy / length
+        if self._index is not None:
+            return self._index.find_along(x, y, ux, uy, max_dist)
+        hits = [ ]
+        for gobj in reversed(self._contents):
+            bounds = gobj.get_bounds()
+            if bounds is not None:
+                box = (bounds._x, bounds._y, bounds._x + bounds._width,
+                       bounds._y + bounds._height)
+                t = _trace_ray(gobj, x, y, ux, uy, max_dist, box)
+                if t is not None:
+                    hits.append((t, -gobj._zkey, gobj))
+        hits.sort(key=_get_ray_order)
+        return [ hit[2] for hit in hits ]
+
 # Public method: get_element_count
 
     def get_element_count(self):
@@ -1336,29 +2472,30 @@ class GCompound(GObject):
             return GRectangle(x0, y0, 0, 0)
         x_min = sys.float_info.max
         y_min = sys.float_info.max
-        x_max = sys.float_info.min
-        y_max = sys.float_info.min
+        x_max = -sys.float_info.max
+        y_max = -sys.float_info.max
         for gobj in self._contents:
             bounds = gobj.get_bounds()
-            x_min = min(x_min, x0 + bounds._x)
-            y_min = min(y_min, y0 + bounds._y)
-            x_max = max(x_max, x0 + bounds._x)
-            y_max = max(y_max, y0 + bounds._y)
-            x_min = min(x_min, x0 + bounds._x + bounds.get_width())
-            y_min = min(y_min, y0 + bounds._y + bounds.get_height())
-            x_max = max(x_max, x0 + bounds._x + bounds.get_width())
-            y_max = max(y_max, y0 + bounds._y + bounds.get_height())
-        return GRectangle(x_min, y_min, x_max - x_min, y_max - y_min)
+            bx = bounds._x
+            by = bounds._y
+            x_min = min(x_min, bx, bx + bounds._width)
+            y_min = min(y_min, by, by + bounds._height)
+            x_max = max(x_max, bx, bx + bounds._width)
+            y_max = max(y_max, by, by + bounds._height)
+        sf = self._sf
+        return GRectangle(x0 + sf * x_min, y0 + sf * y_min,
+                          sf * (x_max - x_min), sf * (y_max - y_min))
 
 # Public method: contains
 
-    def contains(self, x, y):
+    def contains(self, x, y=None):
         """
         Returns true if the specified point is inside the object.
         """
-        refpt = self.get_location()
-        tx = x - refpt._x
-        ty = y - refpt._y
+        if y is None:
+            x, y = _get_point_coords(x)
+        tx = (x - self._x) / self._sf
+        ty = (y - self._y) / self._sf
         for gobj in self._contents:
             if gobj.contains(tx, ty):
                 return True
@@ -1377,105 +2514,286 @@ class GCompound(GObject):
     def __str__(self):
         return "GCompound(...)"
 
+# Override method: scale
+
+    def scale(self, sf):
+        """
+        Scales the <code>GCompound</code> and its components by the
+        specified scale factor about its reference point.
+        """
+        self._sf *= sf
+        self._update_rotation()
+        self._bounds_changed()
+
 # Override method: _update_location
 
     def _update_location(self):
         """
-        Updates the location for this <code>GCompound</code> by
-        rebuilding the entire window if the component is installed.
+        Updates the location for this <code>GCompound</code>.  Every item
+        installed for a component carries the tag of each enclosing
+        compound, so the whole group moves with a single call to the
+        canvas.
         """
         gw = self._get_window()
-        if gw is not None:
-            gw._rebuild()
+        if gw is None or self._ctm_base is None or gw._defer_update(self):
+            return
+        self._move_group(gw)
 
 # Override method: _update_rotation
 
     def _update_rotation(self):
         """
-        Redraws the window on rotation.
+        Reinstalls the components of this <code>GCompound</code> after a
+        rotation or a change of scale.  The spatial index is unaffected,
+        because it records the components in the coordinates of the
+        compound.  Inside a batch, only this compound is marked to be
+        reinstalled when the batch is committed.
         """
-        self._update_location()
+        gw = self._get_window()
+        if gw is None or self._ctm_base is None:
+            return
+        if gw._defer_update(self):
+            self._reinstall_pending = True
+        else:
+            self._install(gw, self._ctm_base)
 
 # Override method: _install
 
     def _install(self, target, ctm):
-        lctm = ctm.compose(_GTransform(self._x, self._y,
-                                       rotation=self._angle, sf=self._sf))
+        self._ctm_base = ctm
+        self._target = target
+        self._item_x = self._x
+        self._item_y = self._y
+        if self._gw is None and self._parent is not None:
+            self._tags = self._parent._tags + (self._tag,)
+        lctm = self._get_local_transform(ctm)
         for gobj in self._contents:
             gobj._install(target, lctm)
 
+# Override method: _reposition
+
+    def _reposition(self, ctm):
+        """
+        Records a new transformation for this <code>GCompound</code> and
+        passes the resulting transformation on to its components.
+        """
+        self._ctm_base = ctm
+        lctm = self._get_local_transform(ctm)
+        for gobj in self._contents:
+            gobj._reposition(lctm)
+
+# Override method: _flush_update
+
+    def _flush_update(self, gw):
+        """
+        Brings the items for this <code>GCompound</code> up to date after
+        a batch, by reinstalling its components if it was rotated or
+        scaled and by moving them as a group otherwise.
+        """
+        reinstall = self._reinstall_pending
+        self._reinstall_pending = False
+        if self._ctm_base is None or self._get_window() is not gw:
+            return
+        if reinstall:
+            self._install(gw, self._ctm_base)
+        else:
+            self._move_group(gw)
+
+# Private method: _move_group
+
+    def _move_group(self, gw):
+        """
+        Moves every item installed for the components of this
+        <code>GCompound</code> by the displacement since the items were
+        last placed.
+        """
+        dx, dy = self._get_displacement()
+        self._item_x = self._x
+        self._item_y = self._y
+        if dx != 0 or dy != 0:
+            gw._move_group(self, dx, dy)
+
+# Override method: _get_displacement
+
+    def _get_displacement(self):
+        """
+        Returns the displacement of this <code>GCompound</code> since its
+        items were last placed.  The location of a compound is added to
+        the transformation of its parent without rotation or scaling, so
+        the displacement is used as it stands.
+        """
+        return self._x - self._item_x, self._y - self._item_y
+
+# Private method: _get_local_transform
+
+    def _get_local_transform(self, ctm):
+        """
+        Returns the transformation for the components of this
+        <code>GCompound</code>, given the transformation of its parent.
+        """
+        if (self._x == 0 and self._y == 0 and self._angle == 0 and
+                self._sf == 1):
+            return ctm
+        return ctm.compose(_GTransform(self._x, self._y,
+                                       rotation=self._angle, sf=self._sf))
+
+# Override method: _get_item_tag
+
+    def _get_item_tag(self):
+        return self._tag
+
+# Override method: _get_first_item
+
+    def _get_first_item(self):
+        for gobj in self._contents:
+            tkid = gobj._get_first_item()
+            if tkid is not None:
+                return tkid
+        return None
+
+# Override method: _get_last_item
+
+    def _get_last_item(self):
+        for gobj in reversed(self._contents):
+            tkid = gobj._get_last_item()
+            if tkid is not None:
+                return tkid
+        return None
+
+# Override method: _uninstall
+
+    def _uninstall(self, target):
+        """
+        Deletes the tkinter objects for every component of this
+        <code>GCompound</code>.
+        """
+        for gobj in self._contents:
+            gobj._uninstall(target)
+
+# Override method: _forget_items
+
+    def _forget_items(self, target):
+        for gobj in self._contents:
+            gobj._forget_items(target)
+
+# Override method: _stop_timers
+
+    def _stop_timers(self):
+        """
+        Stops every running timer owned by this <code>GCompound</code> or
+        by any of its components.
+        """
+        GObject._stop_timers(self)
+        for gobj in self._contents:
+            gobj._stop_timers()
+
 # Internal method: _send_forward
 
     def _send_forward(self, gobj):
-        index = self._find_gobject(gobj)
-        if index == -1:
+        if gobj not in self._contents:
             return
-        if index != len(self._contents) - 1:
-            self._contents.pop(index)
-            self._contents.insert(index + 1, gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
+        other = self._contents.get_next(gobj)
+        if other is not None:
+            gobj._zkey, other._zkey = other._zkey, gobj._zkey
+            self._contents.remove(gobj)
+            self._contents.insert(gobj, self._contents.get_next(other))
+            self._restack_component(gobj)
 
 # Internal method: _send_to_front
 
     def _send_to_front(self, gobj):
-        index = self._find_gobject(gobj)
-        if index == -1:
+        if gobj not in self._contents:
             return
-        if index != len(self._contents) - 1:
-            self._contents.pop(index)
-            self._contents.append(gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
+        if self._contents.get_next(gobj) is not None:
+            gobj._zkey = self._top_zkey
+            self._top_zkey += 1
+            self._contents.remove(gobj)
+            self._contents.insert(gobj)
+            self._restack_component(gobj)
 
 # Internal method: _send_backward
 
     def _send_backward(self, gobj):
-        index = self._find_gobject(gobj)
-        if index == -1:
+        if gobj not in self._contents:
             return
-        if index != 0:
-            self._contents.pop(index)
-            self._contents.insert(index - 1, gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
+        other = self._contents.get_previous(gobj)
+        if other is not None:
+            gobj._zkey, other._zkey = other._zkey, gobj._zkey
+            self._contents.remove(gobj)
+            self._contents.insert(gobj, other)
+            self._restack_component(gobj)
 
 # Internal method: _send_to_back
 
     def _send_to_back(self, gobj):
-        index = self._find_gobject(gobj)
-        if index == -1:
+        if gobj not in self._contents:
             return
-        if index != 0:
-            self._contents.pop(index)
-            self._contents.insert(0, gobj)
-            gw = self._get_window()
-            if gw is not None:
-                gw._rebuild()
-
-# Internal method: _find_gobject
-
-    def _find_gobject(self, gobj):
-        n = len(self._contents)
-        for i in range(n):
-            if self._contents[i] == gobj:
-                return i
-        return -1
+        other = self._contents.get_first()
+        if other is not gobj:
+            self._bottom_zkey -= 1
+            gobj._zkey = self._bottom_zkey
+            self._contents.remove(gobj)
+            self._contents.insert(gobj, other)
+            self._restack_component(gobj)
+
+# Internal method: _restack_component
+
+    def _restack_component(self, gobj):
+        """
+        Moves the items for a component on the canvas to match its new
+        place among the components of this <code>GCompound</code>.  The
+        items are raised just above the last item of the nearest
+        component behind it or, if there is none, lowered just below the
+        first item of the nearest component in front of it.  Inside a
+        batch, the stacking order is restored by the rebuild when the
+        batch is committed.
+        """
+        gw = self._get_window()
+        if gw is None or gobj._get_last_item() is None:
+            return
+        if gw._batch_depth > 0:
+            gw._rebuild()
+            return
+        tag = gobj._get_item_tag()
+        other = self._contents.get_previous(gobj)
+        while other is not None:
+            tkid = other._get_last_item()
+            if tkid is not None:
+                gw._raise_items(tag, tkid)
+                return
+            other = self._contents.get_previous(other)
+        other = self._contents.get_next(gobj)
+        while other is not None:
+            tkid = other._get_first_item()
+            if tkid is not None:
+                gw._lower_items(tag, tkid)
+                return
+            other = self._contents.get_next(other)
+
+# Internal method: _remove_component
+
+    def _remove_component(self, gobj):
+        self._contents.remove(gobj)
+        gobj._parent = None
+        if self._index is not None:
+            self._index.remove(gobj)
 
-# Internal method: _remove_at
+# Internal method: _child_bounds_changed
 
-    def _remove_at(self, index):
-        gobj = self._contents[index]
-        self._contents.pop(index)
-        gobj._parent = None
+    def _child_bounds_changed(self, gobj):
+        if self._index is not None:
+            self._index.update(gobj)
+        self._bounds_changed()
 
 # Define camel-case names
 
+    addAll = add_all
     removeAll = remove_all
     getElementAt = get_element_at
+    setSpatialIndex = set_spatial_index
+    hasSpatialIndex = has_spatial_index
+    getElementsAt = get_elements_at
+    getElementsIn = get_elements_in
     getElementCount = get_element_count
     getElement = get_element
     getBounds = get_bounds
@@ -1543,7 +2861,8 @@ class GArc(GFillableObject):
         Sets the starting angle for this <code>GArc</code> object.
         """
         self._start = start
-        self._update_properties(start=start)
+        self._update_item()
+        self._bounds_changed()
 
 # Public method: get_start_angle
 
@@ -1560,7 +2879,8 @@ class GArc(GFillableObject):
         Sets the sweep angle for this GArc object.
         """
         self._sweep = sweep
-        self._update_properties(extent=sweep)
+        self._update_item()
+        self._bounds_changed()
 
 # Public method: get_sweep_angle
 
@@ -1595,14 +2915,11 @@ class GArc(GFillableObject):
         if isinstance(x, GRectangle):
             width, height = x.get_width(), x.get_height()
             x, y = x.get_x(), x.get_y()
+        self._frame_width = width
+        self._frame_height = height
         self.set_location(x, y)
-        gw = self._get_window()
-        if gw is None:
-            return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        tkc.coords(self._tkid, coords[0], coords[1],
-                   coords[0] + width, coords[1] + height)
+        self._update_item()
+        self._bounds_changed()
 
 # Public method: get_frame_rectangle
 
@@ -1625,9 +2942,9 @@ class GArc(GFillableObject):
         the center.
         """
         GFillableObject.set_filled(self, flag)
-        style = tkinter.ARC
+        style = "arc"
         if flag:
-            style = tkinter.PIESLICE
+            style = "pieslice"
         self._update_properties(style=style)
 
 # Public method: get_bounds
@@ -1667,10 +2984,12 @@ class GArc(GFillableObject):
 
 # Public method: contains
 
-    def contains(self, x, y):
+    def contains(self, x, y=None):
         """
         Returns true if the specified point is inside the object.
         """
+        if y is None:
+            x, y = _get_point_coords(x)
         rx = self._frame_width / 2
         ry = self._frame_height / 2
         if rx == 0 or ry == 0:
@@ -1703,58 +3022,49 @@ class GArc(GFillableObject):
                 str(self._frame_height) + ", " +
                 str(self._start) + ", " + str(self._sweep) + ")")
 
-# Override method: _install
+# Override method: _create_item_spec
 
-    def _install(self, target, ctm):
+    def _create_item_spec(self, target, ctm):
         """
-        Installs the <code>GArc</code> in the canvas.
+        Returns the tkinter item specification for the <code>GArc</code>.
         """
-        gw = target
-        tkc = gw._canvas
-        lctm = _GTransform(rotation=self._angle + ctm._rotation,
-                           sf=self._sf * ctm._sf)
+        rotation = self._angle + ctm._rotation
         p0 = ctm.transform(self._x, self._y)
-        if lctm._rotation == 0:
+        options = self._get_color_options()
+        options["width"] = self._line_width
+        if rotation == 0:
             self._rep = "Arc"
-            style = tkinter.ARC
+            style = "arc"
             if self._fill_flag:
-                style = tkinter.PIESLICE
+                style = "pieslice"
             p1 = ctm.transform(self._x + self._frame_width,
                                self._y + self._frame_height)
-            self._tkid = tkc.create_arc(p0._x, p0._y, p1._x, p1._y,
-                                        start=self._start,
-                                        extent=self._sweep,
-                                        width=self._line_width,
-                                        style=style)
+            kind = "arc"
+            coords = [ p0._x, p0._y, p1._x, p1._y ]
+            options["start"] = self._start
+            options["extent"] = self._sweep
+            options["style"] = style
         else:
             self._rep = "Polygon"
+            lctm = _GTransform(rotation=rotation, sf=self._sf * ctm._sf)
+            coords = self._create_arc_coords(p0._x, p0._y,
+                                             self._frame_width,
+                                             self._frame_height,
+                                             self._start, self._sweep,
+                                             self._fill_flag, lctm)
             if self._fill_flag:
-                coords = self._create_arc_coords(p0._x, p0._y,
-                                                 self._frame_width,
-                                                 self._frame_height,
-                                                 self._start, self._sweep,
-                                                 True, lctm)
-                self._tkid = tkc.create_polygon(*coords,
-                                                width=self._line_width,
-                                                smooth=1)
+                kind = "polygon"
             else:
-                coords = self._create_arc_coords(p0._x, p0._y,
-                                                 self._frame_width,
-                                                 self._frame_height,
-                                                 self._start, self._sweep,
-                                                 False, lctm)
-                self._tkid = tkc.create_line(*coords,
-                                             width=self._line_width,
-                                             smooth=1)
-        self._update_color()
+                kind = "line"
+            options["smooth"] = 1
+        return kind, coords, options
 
 # Override method: set_filled
 
     def set_filled(self, flag):
         GFillableObject.set_filled(self, flag)
-        gw = self._get_window()
-        if gw is not None:
-            gw._rebuild()
+        self._update_item()
+        self._bounds_changed()
 
 # Override method: _update_rotation
 
@@ -1762,33 +3072,22 @@ class GArc(GFillableObject):
         """
         Updates the points for this <code>GArc</code> after a rotation.
         """
-        gw = self._get_window()
-        if gw is not None:
-            tkc = gw._canvas
-            ctm = self._ctm_base
-            lctm = _GTransform(rotation=self._angle + ctm._rotation,
-                               sf=self._sf * ctm._sf)
-            coords = self._create_arc_coords(p0._x, p0._y,
-                                             self._frame_width,
-                                             self._frame_height,
-                                             self._start, self._sweep,
-                                             self._fill_flag, lctm)
-            tkc.coords(self._tkid, *coords)
+        self._update_item()
 
-# Override method: _update_color
+# Override method: _get_color_options
 
-    def _update_color(self):
+    def _get_color_options(self):
         """
-        Updates the color properties for a <code>GArc</code>.
+        Returns the color options for a <code>GArc</code>.
         """
         if self._fill_flag:
             outline = self._color
             fill = self._fill_color
             if fill is None or fill == "":
                 fill = outline
-            self._update_properties(outline=outline, fill=fill)
+            return { "outline": outline, "fill": fill }
         else:
-            self._update_properties(fill=self._color)
+            return { "fill": self._color }
 
 # Private method: _create_arc_coords
 
@@ -1905,6 +3204,7 @@ class GLine(GObject):
         self._x = x
         self._y = y
         self._update_points()
+        self._bounds_changed()
 
 # Public method: get_start_point
 
@@ -1924,6 +3224,7 @@ class GLine(GObject):
         self._dx = x - self._x
         self._dy = y - self._y
         self._update_points()
+        self._bounds_changed()
 
 # Public method: get_end_point
 
@@ -1935,10 +3236,12 @@ class GLine(GObject):
 
 # Overload method: contains
 
-    def contains(self, x, y):
+    def contains(self, x, y=None):
         """
         Returns true if the specified point is inside the object.
         """
+        if y is None:
+            x, y = _get_point_coords(x)
         x0 = self._x
         y0 = self._y
         x1 = x0 + self._dx
@@ -1988,26 +3291,20 @@ class GLine(GObject):
         y1 = max(self._y, self._y + self._dy)
         return GRectangle(x0, y0, x1 - x0, y1 - y0)
 
-# Override method: _install
+# Override method: _create_item_spec
 
-    def _install(self, target, ctm):
+    def _create_item_spec(self, target, ctm):
         """
-        Installs the <code>GLine</code> in the canvas.
+        Returns the tkinter item specification for the <code>GLine</code>.
         """
-        gw = target
-        tkc = gw._canvas
-        self._base_ctm = ctm
         p0 = ctm.transform(self._x, self._y)
         angle = ctm._rotation + self._angle
         ctm = _GTransform(rotation=angle, sf=ctm._sf)
-        deltas = ctm.transform(self._dx, self._dy)
-        x1 = p0._x + deltas._x
-        y1 = p0._y + deltas._y
         dp = ctm.transform(self._dx, self._dy)
-        self._tkid = tkc.create_line(p0._x, p0._y,
-                                     p0._x + dp._x, p0._y + dp._y,
-                                     width=self.get_line_width(),
-                                     fill=self._color)
+        coords = [ p0._x, p0._y, p0._x + dp._x, p0._y + dp._y ]
+        options = self._get_color_options()
+        options["width"] = self.get_line_width()
+        return "line", coords, options
 
 # Override method: _update_points
 
@@ -2015,16 +3312,7 @@ class GLine(GObject):
         """
         Updates the points in the <code>GLine</code>.
         """
-        gw = self._get_window()
-        if gw is None:
-            return
-        tkc = gw._canvas
-        ctm = self._base_ctm
-        p0 = ctm.transform(self._x, self._y)
-        angle = ctm._rotation + self._angle
-        ctm = _GTransform(rotation=angle, sf=ctm._sf)
-        dp = ctm.transform(self._dx, self._dy)
-        tkc.coords(self._tkid, p0._x, p0._y, p0._x + dp._x, p0._y + dp._y)
+        self._update_item()
 
 # Override method: _update_rotation
 
@@ -2054,21 +3342,19 @@ class GImage(GObject):
         Initializes a new image by loading the image from the specified
         source, which must be the name of a file containing the image, a
         URL that holds a remote image, or a two-dimensional array of pixels.
+        Images loaded from files and URLs are shared through a process-wide
+        cache, so that every <code>GImage</code> created from the same
+        source uses a single decoded copy.  When PIL is available, the
+        displayed image is created only when the object is added to a
+        window.
         """
         GObject.__init__(self)
         self._source = source
         self._image_model = _image_model
+        self._sf = 1
         if _image_model == "PIL":
             if isinstance(source, str):
-                if "://" in source:
-                    ctx = ssl.create_default_context()
-                    ctx.check_hostname = False
-                    ctx.verify_mode = ssl.CERT_NONE
-                    with urllib.request.urlopen(source, context=ctx) as req:
-                        self._image = Image.open(io.BytesIO(req.read()))
-                else:
-                    self._image = Image.open(source)
-                self._image.load()
+                self._image = _decoded_images.load(source)
             else:
                 width = len(source[0])
                 height = len(source)
@@ -2083,24 +3369,57 @@ class GImage(GObject):
                         ba[base + 3] = (argb >> 24) & 0xFF
                 self._image = Image.frombytes("RGBA", (width, height),
                                               bytes(ba))
-            self._photo = ImageTk.PhotoImage(self._image)
+            self._photo = None
+            self._update_size()
         else:
             if isinstance(source, str):
                 self._photo = tkinter.PhotoImage(file=source)
             else:
                 raise ImportError("get_pixel_array requires the " +
                                   "Pillow library")
+            self._width = self._photo.width()
+            self._height = self._photo.height()
         self.set_location(x, y)
-        self._sf = 1
 
 # Public method: get_bounds
 
     def get_bounds(self):
         """
-        Returns the bounding rectangle for this object
+        Returns the bounding rectangle for this object.  The size is
+        computed from the image, its scale factor, and its rotation when
+        any of these changes.
+        """
+        return GRectangle(self._x, self._y, self._width, self._height)
+
+# Override method: get_width
+
+    def get_width(self):
+        """
+        Returns the width of this <code>GImage</code>.
+        """
+        return self._width
+
+# Override method: get_height
+
+    def get_height(self):
+        """
+        Returns the height of this <code>GImage</code>.
+        """
+        return self._height
+
+# Override method: contains
+
+    def contains(self, x, y=None):
+        """
+        Returns true if the specified point is inside the bounding
+        rectangle of the image.
         """
-        photo = self._photo
-        return GRectangle(self._x, self._y, photo.width(), photo.height())
+        if y is None:
+            x, y = _get_point_coords(x)
+        x0 = self._x
+        y0 = self._y
+        return (x >= x0 and y >= y0 and
+                x < x0 + self._width and y < y0 + self._height)
 
 # Public method: get_pixel_array
 
@@ -2137,9 +3456,9 @@ class GImage(GObject):
         if self._image_model != "PIL":
             raise Exception("Image scaling is available only if PIL is loaded")
         self._sf *= sf
-        gw = self._get_window()
-        if gw is not None:
-            gw._rebuild()
+        self._update_size()
+        self._update_item()
+        self._bounds_changed()
 
 # Override method: get_type
 
@@ -2149,28 +3468,28 @@ class GImage(GObject):
         """
         return "GImage"
 
-# Override method: _install
+# Override method: _create_item_spec
 
-    def _install(self, target, ctm):
+    def _create_item_spec(self, target, ctm):
         """
-        Installs the <code>GImage</code> in the canvas.
+        Returns the tkinter item specification for the <code>GImage</code>.
+        The tkinter image comes from the photo cache of the target window,
+        which shares a single converted image among all objects that
+        display the same image at the same scale and rotation.
         """
-        gw = target
-        tkc = gw._canvas
         pt = ctm.transform(self._x, self._y)
         x = pt._x
         y = pt._y
-        ctm = ctm.compose(_GTransform(rotation=self._angle, sf=self._sf))
-        img = self._image
-        rotation = ctm._rotation % 360
-        if ctm._sf != 1:
-            w = round(img.width * ctm._sf)
-            h = round(img.height * ctm._sf)
-            img = img.resize((w, h), Image.ANTIALIAS)
+        rotation = (ctm._rotation + self._angle) % 360
+        sf = ctm._sf * self._sf
+        if self._image_model == "PIL":
+            self._photo = target._photo_cache.get(self._image, sf, rotation)
         if rotation != 0:
-            w = img.width 
-            h = img.height
-            img = img.rotate(rotation, expand=True)
+            w = self._image.width
+            h = self._image.height
+            if sf != 1:
+                w = round(w * sf)
+                h = round(h * sf)
             if rotation > 0 and rotation <= 90:
                 theta = math.radians(rotation)
                 y -= w * math.sin(theta)
@@ -2184,11 +3503,20 @@ class GImage(GObject):
                 y -= h * math.cos(theta)
             else:
                 theta = math.radians(rotation - 270)
-                x -= h * math.cos(theta)            
-        self._photo = ImageTk.PhotoImage(img)
-        self._tkid = tkc.create_image(x, y,
-                                      anchor=tkinter.NW,
-                                      image=self._photo)
+                x -= h * math.cos(theta)
+        return "image", [ x, y ], { "anchor": "nw",
+                                    "image": self._photo }
+
+# Override method: _release
+
+    def _release(self):
+        """
+        Drops the reference to the tkinter image for a
+        <code>GImage</code> backed by a PIL image, which is fetched again
+        from the photo cache if the object is added to a window.
+        """
+        if self._image_model == "PIL":
+            self._photo = None
 
 # Override method: _update_rotation
 
@@ -2196,9 +3524,45 @@ class GImage(GObject):
         """
         Updates this <code>GImage</code> after a rotation.
         """
-        gw = self._get_window()
-        if gw is not None:
-            gw._rebuild()
+        if self._image_model == "PIL":
+            self._update_size()
+        self._update_item()
+
+# Private method: _update_size
+
+    def _update_size(self):
+        """
+        Computes the size of the displayed image from the decoded image,
+        the scale factor, and the rotation of this <code>GImage</code>.
+        The size is computed in the same way as by PIL, so that it matches
+        the image created when the object is installed, and it is correct
+        even while the installation is deferred by a batch.
+        """
+        w = self._image.width
+        h = self._image.height
+        if self._sf != 1:
+            w = round(w * self._sf)
+            h = round(h * self._sf)
+        rotation = self._angle % 360
+        if rotation == 90 or rotation == 270:
+            w, h = h, w
+        elif rotation != 0 and rotation != 180:
+            theta = -math.radians(rotation)
+            ct = round(math.cos(theta), 15)
+            st = round(math.sin(theta), 15)
+            cx = w / 2.0
+            cy = h / 2.0
+            tx = cx - ct * cx - st * cy
+            ty = cy + st * cx - ct * cy
+            xs = [ ]
+            ys = [ ]
+            for x, y in ((0, 0), (w, 0), (w, h), (0, h)):
+                xs.append(ct * x + st * y + tx)
+                ys.append(-st * x + ct * y + ty)
+            w = math.ceil(max(xs)) - math.floor(min(xs))
+            h = math.ceil(max(ys)) - math.floor(min(ys))
+        self._width = w
+        self._height = h
 
 # Static method: get_red
 
@@ -2236,6 +3600,48 @@ class GImage(GObject):
         """
         return pixel >> 24 & 0xFF
 
+# Static method: evict_cached_image
+
+    @staticmethod
+    def evict_cached_image(source):
+        """
+        Removes the decoded image for the specified file name or URL from
+        the shared image cache.  Existing <code>GImage</code> objects are
+        unaffected, but the next <code>GImage</code> created from that
+        source decodes it again.
+        """
+        _decoded_images.evict(source)
+
+# Static method: clear_image_cache
+
+    @staticmethod
+    def clear_image_cache():
+        """
+        Removes every decoded image from the shared image cache.
+        """
+        _decoded_images.clear()
+
+# Static method: get_image_cache_bytes
+
+    @staticmethod
+    def get_image_cache_bytes():
+        """
+        Returns the number of bytes of pixel data held by the shared
+        image cache.
+        """
+        return _decoded_images.get_bytes()
+
+# Static method: set_image_cache_limit
+
+    @staticmethod
+    def set_image_cache_limit(max_bytes):
+        """
+        Sets the maximum number of bytes of pixel data held by the shared
+        image cache.  When the limit is exceeded, the least recently used
+        images are removed from the cache.
+        """
+        _decoded_images.set_max_bytes(max_bytes)
+
 # Static method: create_rgb_pixel
 
     @staticmethod
@@ -2281,6 +3687,10 @@ class GImage(GObject):
     getGreen = get_green
     getBlue = get_blue
     getAlpha = get_alpha
+    evictCachedImage = evict_cached_image
+    clearImageCache = clear_image_cache
+    getImageCacheBytes = get_image_cache_bytes
+    setImageCacheLimit = set_image_cache_limit
     createRGBPixel = create_rgb_pixel
 
 # Class: GLabel
@@ -2305,7 +3715,7 @@ class GLabel(GObject):
         GObject.__init__(self)
         self._text = text
         self._font = self.DEFAULT_FONT
-        self._tk_font = _decode_font(self._font)
+        self._update_metrics()
         self.set_location(x, y)
 
 # Public method: set_font
@@ -2317,9 +3727,9 @@ class GLabel(GObject):
         where both <code>style</code> and <code>size</code> are optional.
         """
         self._font = font
-        self._tk_font = _decode_font(self._font)
-        self._update_properties(font=self._tk_font)
-        self._update_location()
+        self._update_metrics()
+        self._update_item()
+        self._bounds_changed()
 
 # Public method: get_font
 
@@ -2337,7 +3747,9 @@ class GLabel(GObject):
         a new text string appears on the display.
         """
         self._text = text
+        self._width = None
         self._update_properties(text=text)
+        self._bounds_changed()
 
 # Public method: get_label
 
@@ -2354,7 +3766,7 @@ class GLabel(GObject):
         Returns the maximum distance strings in this font extend above
         the baseline.
         """
-        return self._tk_font.metrics("ascent")
+        return self._ascent
 
 # Public method: get_descent
 
@@ -2363,15 +3775,18 @@ class GLabel(GObject):
         Returns the maximum distance strings in this font descend below
         the baseline.
         """
-        return self._tk_font.metrics("descent")
+        return self._descent
 
 # Override method: get_width
 
     def get_width(self):
         """
-        Returns the width for this <code>GLabel</code>.
+        Returns the width for this <code>GLabel</code>.  The width is
+        measured when it is first needed after the text or font changes.
         """
-        return self._tk_font.measure(self._text)
+        if self._width is None:
+            self._width = self._decoded_font.measure(self._text)
+        return self._width
 
 # Override method: get_height
 
@@ -2379,7 +3794,7 @@ class GLabel(GObject):
         """
         Returns the height for this <code>GLabel</code>.
         """
-        return self._tk_font.metrics("linespace")
+        return self._height
 
 # Override method: get_bounds
 
@@ -2387,8 +3802,22 @@ class GLabel(GObject):
         """
         Returns the bounding rectangle for this object.
         """
-        return GRectangle(self._x, self._y - self.get_ascent(),
-                          self.get_width(), self.get_height())
+        return GRectangle(self._x, self._y - self._ascent,
+                          self.get_width(), self._height)
+
+# Override method: contains
+
+    def contains(self, x, y=None):
+        """
+        Returns true if the specified point is inside the bounding
+        rectangle of the label.
+        """
+        if y is None:
+            x, y = _get_point_coords(x)
+        x0 = self._x
+        y0 = self._y - self._ascent
+        return (x >= x0 and y >= y0 and
+                x < x0 + self.get_width() and y < y0 + self._height)
 
 # Override method: get_type
 
@@ -2398,29 +3827,21 @@ class GLabel(GObject):
         """
         return "GLabel"
 
-# Override method: _update_location
+# Private method: _update_metrics
 
-    def _update_location(self):
+    def _update_metrics(self):
         """
-        Updates the location for this <code>GLabel</code> from the stored
-        x and y values.  This override is necessary to adjust for the
-        baseline.
+        Looks up the current font in the shared font cache, records its
+        metrics, and discards the measured width.  Labels that use the
+        same font string share the decoded font and its measurements.
         """
-        gw = self._get_window()
-        if gw is None:
-            return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        offx = 0
-        offy = self.get_height() - self.get_ascent()
-        gobj = self.get_parent()
-        while gobj is not None:
-            offx += gobj._x
-            offy += gobj._y
-            gobj = gobj.get_parent()
-        dx = (self._x + offx) - coords[0]
-        dy = (self._y + offy) - coords[1]
-        tkc.move(self._tkid, dx, dy)
+        decoded = _decoded_fonts.get(self._font)
+        self._decoded_font = decoded
+        self._tk_font = decoded._font
+        self._ascent = decoded._ascent
+        self._descent = decoded._descent
+        self._height = decoded._linespace
+        self._width = None
 
 # Override method: _install
 
@@ -2428,65 +3849,126 @@ class GLabel(GObject):
         """
         Installs the <code>GLabel</code> in the canvas.
         """
-        gw = target
-        tkc = gw._canvas
-        self._ctm_base = ctm
+        try:
+            GObject._install(self, target, ctm)
+        except Exception:
+            if ctm.get_rotation() + self._angle == 0:
+                raise
+            raise Exception("GLabel rotation requires tkinter v6")
+
+# Override method: _create_item_spec
+
+    def _create_item_spec(self, target, ctm):
+        """
+        Returns the tkinter item specification for the <code>GLabel</code>.
+        """
         pt = ctm.transform(self._x, self._y)
         dtm = _GTransform(rotation=self._angle, sf=self._sf)
         ctm = ctm.compose(dtm)
         dp = dtm.transform(0, self.get_height() - self.get_ascent())
         x = pt._x + dp._x
-        y = pt._y + dp._y
-        baseline = y;
-        if ctm.get_rotation() == 0:
-            self._tkid = tkc.create_text(x,
-                                         baseline,
-                                         text=self._text,
-                                         font=self._tk_font,
-                                         fill=self._color,
-                                         anchor="sw")
-        else:
-            try:
-                self._tkid = tkc.create_text(x,
-                                             baseline,
-                                             text=self._text,
-                                             font=self._tk_font,
-                                             fill=self._color,
-                                             angle=ctm.get_rotation(),
-                                             anchor="sw")
-            except:
-                raise Exception("GLabel rotation requires tkinter v6")
+        baseline = pt._y + dp._y
+        options = self._get_color_options()
+        options["text"] = self._text
+        options["font"] = self._tk_font
+        options["anchor"] = "sw"
+        if ctm.get_rotation() != 0:
+            options["angle"] = ctm.get_rotation()
+        return "text", [ x, baseline ], options
+
+# Override method: _update_rotation
+
+    def _update_rotation(self):
+        """
+        Updates this <code>GLabel</code> after a rotation.
+        """
+        self._update_item()
+
+# Override method: __str__
+
+    def __str__(self):
+        return "GLabel(\"" + self._text + "\")"
+
+# Define camel-case names
+
+    setFont = set_font
+    getFont = get_font
+    setLabel = set_label
+    getLabel = get_label
+    getAscent = get_ascent
+    getDescent = get_descent
+    getWidth = get_width
+    getHeight = get_height
+    getBounds = get_bounds
+    getType = get_type
+
+# Class: GBoundLabel
+
+class GBoundLabel(GLabel):
+    """
+    This subclass of <code>GLabel</code> displays a value obtained from a
+    provider function, formatted using a format string.  Calling
+    <code>refresh</code> reads the value again and changes the text of
+    the label only if the formatted text is different, so that a label
+    showing a score or a count of lives can be refreshed as often as
+    necessary and changes the display only when the value does.
+    """
+
+# Constructor: GBoundLabel
+
+    def __init__(self, provider, fmt="{}", x=0, y=0):
+        """
+        Initializes a <code>GBoundLabel</code> that displays the value
+        returned by the function <code>provider</code>, formatted by
+        calling the <code>format</code> method of the string
+        <code>fmt</code>.
+        """
+        self._provider = provider
+        self._format = fmt
+        GLabel.__init__(self, fmt.format(provider()), x, y)
+
+# Public method: refresh
+
+    def refresh(self):
+        """
+        Reads the value from the provider and updates the label if the
+        formatted text has changed.  This method returns
+        <code>True</code> if the text changed.
+        """
+        text = self._format.format(self._provider())
+        if text == self._text:
+            return False
+        self.set_label(text)
+        return True
+
+# Public method: set_provider
+
+    def set_provider(self, provider):
+        """
+        Sets the function that supplies the value for this label and
+        refreshes the label.
+        """
+        self._provider = provider
+        self.refresh()
 
-# Override method: _update_rotation
+# Public method: set_format
 
-    def _update_rotation(self):
+    def set_format(self, fmt):
         """
-        Updates this <code>GLabel</code> after a rotation.
+        Sets the format string for this label and refreshes the label.
         """
-        gw = self._get_window()
-        if gw is None:
-            return
-        ctm = self._ctm_base
-        ctm = ctm.compose(_GTransform(rotation=self._angle, sf=self._sf))
-        self._update_properties(angle=ctm.get_rotation())
+        self._format = fmt
+        self.refresh()
 
 # Override method: __str__
 
     def __str__(self):
-        return "GLabel(\"" + self._text + "\")"
+        return "GBoundLabel(\"" + self._text + "\")"
 
 # Define camel-case names
 
-    setFont = set_font
-    getFont = get_font
-    setLabel = set_label
-    getLabel = get_label
-    getAscent = get_ascent
-    getDescent = get_descent
-    getWidth = get_width
-    getHeight = get_height
-    getBounds = get_bounds
-    getType = get_type
+    setProvider = set_provider
+    setFormat = set_format
 
 # Class: GPolygon
 
@@ -2520,6 +4002,7 @@ class GPolygon(GFillableObject):
         self._cx = x
         self._cy = y
         self._vertices.append(GPoint(x, y))
+        self._bounds_changed()
 
 # Public method: add_edge
 
@@ -2578,10 +4061,12 @@ class GPolygon(GFillableObject):
 
 # Public method: contains
 
-    def contains(self, x, y):
+    def contains(self, x, y=None):
         """
         Returns true if the specified point is inside the object.
         """
+        if y is None:
+            x, y = _get_point_coords(x)
         tx = x - self._x
         ty = y - self._y
         crossings = 0
@@ -2610,55 +4095,39 @@ class GPolygon(GFillableObject):
         """
         return "GPolygon"
 
-# Override method: _update_location
-
-    def _update_location(self):
-        """
-        Updates the location for this object from the stored x and y values.
-        """
-        gw = self._get_window()
-        if gw is None:
-            return
-        tkc = gw._canvas
-        coords = tkc.coords(self._tkid)
-        oldx = coords[0]
-        oldy = coords[1]
-        coords = self._create_coords()
-        dx = oldx - coords[0]
-        dy = oldy - coords[1]
-        tkc.move(self._tkid, dx, dy)
-
 # Override method: _update_rotation
 
     def _update_rotation(self):
         """
         Updates this <code>GPolygon</code> after a rotation.
         """
-        gw = self._get_window()
-        if gw is None:
-            return
-        tkc = gw._canvas
-        coords = self._create_coords()
-        tkc.coords(self._tkid, *coords)
+        self._update_item()
 
-# Override method: _install
+# Override method: _create_item_spec
 
-    def _install(self, target, ctm):
+    def _create_item_spec(self, target, ctm):
         """
-        Installs the <code>GPolygon</code> in the canvas.
+        Returns the tkinter item specification for the
+        <code>GPolygon</code>.
         """
-        gw = target
-        tkc = gw._canvas
-        self._ctm_base = ctm
-        coords = self._create_coords()
-        self._tkid = tkc.create_polygon(*coords, width=self._line_width)
-        self._update_color()
+        options = self._get_color_options()
+        options["width"] = self._line_width
+        return "polygon", self._create_coords(), options
 
 # Override method: __str__
 
     def __str__(self):
         return "GPolygon(" + str(len(self._vertices)) + " vertices)"
 
+# Override method: _get_displacement
+
+    def _get_displacement(self):
+        """
+        Returns the displacement of the <code>GPolygon</code>, which, like
+        that of a compound, is not rotated or scaled by its parent.
+        """
+        return self._x - self._item_x, self._y - self._item_y
+
 # Private method: _create_coords
 
     def _create_coords(self):
@@ -2689,6 +4158,8 @@ class GPoint:
     a location on the graphics plane.
     """
 
+    __slots__ = ("_x", "_y")
+
 # Constructor: GPoint
 
     def __init__(self, x=0, y=0):
@@ -2735,6 +4206,8 @@ class GDimension:
     used to indicate the size of a graphical object.
     """
 
+    __slots__ = ("_width", "_height")
+
 # Constructor: GDimension
 
     def __init__(self, width=0.0, height=0.0):
@@ -2786,6 +4259,8 @@ class GRectangle:
     used to represent the bounding box of a graphical object.
     """
 
+    __slots__ = ("_x", "_y", "_width", "_height")
+
 # Constructor: GRectangle
 
     def __init__(self, x=0.0, y=0.0, width=0.0, height=0.0):
@@ -2840,15 +4315,13 @@ class GRectangle:
 
 # Public method: contains
 
-    def contains(self, x, y):
+    def contains(self, x, y=None):
         """
         Returns <code>True</code> if the specified point is inside the
         rectangle.
         """
-        if isinstance(x, GPoint):
-            x, y = x.get_x(), x.get_y()
-        elif isinstance(x, dict):
-            x, y = x.x, x.y
+        if y is None:
+            x, y = _get_point_coords(x)
         return (x >= self._x and
                 y >= self._y and
                 x < self._x + self._width and
@@ -2896,8 +4369,9 @@ class GTimer:
         self._fn = fn
         self._delay = delay
         self._repeats = False
-        self._after_id = None
-        gw._timers.append(self)
+        self._seq = 0
+        self._due = None
+        self._owner = None
 
 # Public method: set_repeats
 
@@ -2911,10 +4385,12 @@ class GTimer:
 
     def start(self):
         """
-        Starts the timer.
+        Starts the timer.  All timers in a window are driven by a single
+        scheduler, which fires every timer that is due from one tkinter
+        callback.  Starting a timer that is already running restarts it.
         """
-        tkc = self._gw._canvas
-        self._after_id = tkc.after(self._delay, self._timer_ticked)
+        gw = self._gw
+        gw._schedule_timer(self, gw._get_clock() + self._delay)
 
 # Public method: stop
 
@@ -2922,18 +4398,7 @@ class GTimer:
         """
         Stops the timer.
         """
-        if self._after_id is not None:
-            tkc = self._gw._canvas
-            tkc.after_cancel(self._after_id)
-            self._after_id = None
-
-# Private method: _timer_ticked
-
-    def _timer_ticked(self):
-        self._fn()
-        if self._repeats and self._after_id is not None:
-            tkc = self._gw._canvas
-            self._after_id = tkc.after(self._delay, self._timer_ticked)
+        self._gw._cancel_timer(self)
 
 # Class: GEvent
 
@@ -2969,13 +4434,15 @@ class GMouseEvent(GEvent):
 
 # Constructor: GMouseEvent
 
-    def __init__(self, tke):
+    def __init__(self, tke, source=None):
         """
         Creates a new <code>GMouseEvent</code> from the corresponding
-        tkinter event tke.
+        tkinter event tke.  The optional <code>source</code> is the root
+        window of the <code>GWindow</code> that received the event.
         """
         self._x = tke.x
         self._y = tke.y
+        self._source = source
 
 # Public method: get_x
 
@@ -3000,7 +4467,9 @@ class GMouseEvent(GEvent):
         Returns the source of the mouse event, which is always the
         root window.
         """
-        return tkinter._root
+        if self._source is not None:
+            return self._source
+        return _get_root()
 
 # Define camel-class methods
 
@@ -3017,11 +4486,13 @@ class GKeyEvent(GEvent):
 
 # Constructor: GKeyEvent
 
-    def __init__(self, tke):
+    def __init__(self, tke, source=None):
         """
         Creates a new <code>GKeyEvent</code> from the corresponding
-        tkinter event tke.
+        tkinter event tke.  The optional <code>source</code> is the root
+        window of the <code>GWindow</code> that received the event.
         """
+        self._source = source
         keysym = tke.keysym.upper()
         if len(keysym) > 1:
             underscore = keysym.find("_")
@@ -3050,7 +4521,9 @@ class GKeyEvent(GEvent):
         Returns the source of the key event, which is always the
         root window.
         """
-        return tkinter._root
+        if self._source is not None:
+            return self._source
+        return _get_root()
 
 # Define camel-class methods
 
@@ -3090,13 +4563,25 @@ class GState:
                 s += str(key) + ":" + repr(self.__dict__[key])
         return "GState(" + s + ")"
 
+# Private function: get_point_coords
+
+def _get_point_coords(pt):
+    """
+    Returns the coordinates of a point given either as a
+    <code>GPoint</code> or as a dictionary with the keys <code>"x"</code>
+    and <code>"y"</code>, as a tuple (x, y).
+    """
+    if isinstance(pt, GPoint):
+        return pt._x, pt._y
+    return pt["x"], pt["y"]
+
 # Private function: get_screen_width
 
 def _get_screen_width():
     """
     Returns the width of the entire display screen.
     """
-    return tkinter._root.winfo_screenwidth()
+    return _get_root().winfo_screenwidth()
 
 # Private function: get_screen_height
 
@@ -3104,7 +4589,22 @@ def _get_screen_height():
     """
     Returns the height of the entire display screen.
     """
-    return tkinter._root.winfo_screenheight()
+    return _get_root().winfo_screenheight()
+
+# Private function: get_root
+
+def _get_root():
+    """
+    Returns the root window of the most recently opened
+    <code>GWindow</code> that is still open.  This is the tkinter root
+    for a window on the screen and its stand-in for a headless or raster
+    window.  If no window is open, the function returns the tkinter root.
+    """
+    if len(_open_roots) > 0:
+        return _open_roots[-1]
+    return tkinter._root
+
+_open_roots = [ ]
 
 # Private function: convert_color_to_rgb
 
@@ -3135,6 +4635,29 @@ def _convert_rgb_to_color(rgb):
     hex_string = hex(0xFF000000 | rgb)
     return "#" + hex_string[4:].upper()
 
+# Private function: decode_color
+
+_MAX_DECODED_COLORS = 256
+_decoded_colors = { }
+
+def _decode_color(color):
+    """
+    Converts a color specification into the canonical form
+    <code>"#RRGGBB"</code>.  The names in <code>COLOR_TABLE</code> are
+    converted in advance, and other specifications are remembered in a
+    table that is emptied when it reaches its maximum size, so that
+    setting a color that has been used before is a dictionary lookup.
+    """
+    result = _CANONICAL_COLORS.get(color)
+    if result is None:
+        result = _decoded_colors.get(color)
+        if result is None:
+            result = _convert_rgb_to_color(_convert_color_to_rgb(color))
+            if len(_decoded_colors) >= _MAX_DECODED_COLORS:
+                _decoded_colors.clear()
+            _decoded_colors[color] = result
+    return result
+
 # Private function: exit_graphics
 
 def _exit_graphics():
@@ -3183,11 +4706,8 @@ def _get_program_name():
 # Private function: canonical_color_name
 
 def _canonical_color_name(str):
-    result = ""
-    for char in str:
-        if not char.isspace() and char != "_":
-            result += char.lower()
-    return result
+    return "".join([ char.lower() for char in str
+                     if not char.isspace() and char != "_" ])
 
 # Private function: dsq
 
@@ -3197,6 +4717,112 @@ def _dsq(x0, y0, x1, y1):
     """
     return (x1 - x0) * (x1 - x0) + (y1 - y0) * (y1 - y0)
 
+# Private function: clip_ray
+
+def _clip_ray(x, y, ux, uy, max_dist, box):
+    """
+    Returns the range of distances along the ray from (x, y) in the unit
+    direction (ux, uy) over which the ray lies within the box
+    (x0, y0, x1, y1), as a tuple (t0, t1), or <code>None</code> if the
+    ray misses the box within <code>max_dist</code>.
+    """
+    t0 = 0.0
+    t1 = max_dist
+    if ux == 0:
+        if x < box[0] or x >= box[2]:
+            return None
+    else:
+        ta = (box[0] - x) / ux
+        tb = (box[2] - x) / ux
+        t0 = max(t0, min(ta, tb))
+        t1 = min(t1, max(ta, tb))
+    if uy == 0:
+        if y < box[1] or y >= box[3]:
+            return None
+    else:
+        ta = (box[1] - y) / uy
+        tb = (box[3] - y) / uy
+        t0 = max(t0, min(ta, tb))
+        t1 = min(t1, max(ta, tb))
+    if t0 > t1:
+        return None
+    return (t0, t1)
+
+# Private function: trace_ray
+
+def _trace_ray(gobj, x, y, ux, uy, max_dist, box):
+    """
+    Returns the first distance within <code>max_dist</code> at which the
+    ray from (x, y) in the unit direction (ux, uy) reaches a point
+    contained in <code>gobj</code>, whose bounding box is <code>box</code>,
+    or <code>None</code> if there is no such point.  The points are tested
+    with <code>contains</code> at intervals of <code>_RAY_STEP</code>, so
+    that the ray sees exactly the shapes that <code>get_element_at</code>
+    would find along it.  The box is widened by the hit tolerance, because
+    lines and arcs contain points just outside their bounds.
+    """
+    tolerance = _HIT_TOLERANCE
+    box = (box[0] - tolerance, box[1] - tolerance,
+           box[2] + tolerance, box[3] + tolerance)
+    span = _clip_ray(x, y, ux, uy, max_dist, box)
+    if span is None:
+        return None
+    t, t1 = span
+    while True:
+        if gobj.contains(x + ux * t, y + uy * t):
+            return t
+        if t >= t1:
+            return None
+        t = min(t + _RAY_STEP, t1)
+
+# Private function: get_zkey
+
+def _get_zkey(gobj):
+    """
+    Returns the z-order key of an object, for use as a sort key.
+    """
+    return gobj._zkey
+
+# Private function: get_ray_order
+
+def _get_ray_order(hit):
+    """
+    Returns the sort key for a raycast hit, which is a tuple consisting
+    of the distance and the negated z-order key.
+    """
+    return (hit[0], hit[1])
+
+# Private function: longest_increasing_subsequence
+
+def _longest_increasing_subsequence(values):
+    """
+    Returns the set of indices of a longest strictly increasing
+    subsequence of <code>values</code>.  The implementation uses the
+    standard patience-sorting algorithm, which runs in O(N log N) time.
+    """
+    tails = [ ]
+    tail_indices = [ ]
+    predecessors = [ ]
+    for i, value in enumerate(values):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_indices.append(i)
+        else:
+            tails[k] = value
+            tail_indices[k] = i
+        if k > 0:
+            predecessors.append(tail_indices[k - 1])
+        else:
+            predecessors.append(-1)
+    result = set()
+    if len(tail_indices) > 0:
+        i = tail_indices[-1]
+        while i != -1:
+            result.add(i)
+            i = predecessors[i]
+    return result
+
 # Private function: decode_font
 
 def _decode_font(name):
@@ -3245,8 +4871,7 @@ def _parse_js_font(name):
         if family.startswith("'") or family.startswith("\""):
             family = family[1:-1]
         # // Add code to test for existence of font family
-        return tk_font.Font(family=family, size=-size,
-                            weight=weight, slant=slant)
+        return _create_font(family, size, weight, slant)
     return None
 
 def _parse_java_font(name):
@@ -3267,6 +4892,16 @@ def _parse_java_font(name):
             weight = "bold"
         if "italic" in components[1]:
             slant = "italic"
+    return _create_font(family, int(size), weight, slant)
+
+def _create_font(family, size, weight, slant):
+    """
+    Creates a font of the specified pixel size.  The font is a tkinter
+    <code>Font</code> if a tkinter window exists and a
+    <code>_HeadlessFont</code> with estimated metrics otherwise.
+    """
+    if getattr(tkinter, "_root", None) is None:
+        return _HeadlessFont(family, size, weight, slant)
     return tk_font.Font(family=family, size=-size,
                         weight=weight, slant=slant)
 
@@ -3288,6 +4923,13 @@ def _parse_js_units(spec):
 # Private class: _GTransform
 
 class _GTransform:
+    """
+    This class represents the transformation from the coordinates of a
+    <code>GCompound</code> to those of the window.  Transformations are
+    never modified once created, which allows them to be shared.
+    """
+
+    __slots__ = ("_tx", "_ty", "_rotation", "_sf")
 
     def __init__(self, tx=0.0, ty=0.0, rotation=0.0, sf=1.0):
         self._tx = tx
@@ -3328,12 +4970,1201 @@ class _GTransform:
             y1 = self._ty + self._sf * (y0 * ct - x0 * st)
         return GPoint(x1, y1)
 
+    def _transform_vector(self, dx, dy):
+        if self._rotation == 0:
+            return self._sf * dx, self._sf * dy
+        ct = math.cos(math.radians(self._rotation))
+        st = math.sin(math.radians(self._rotation))
+        return (self._sf * (dx * ct + dy * st),
+                self._sf * (dy * ct - dx * st))
+
     def compose(self, transform):
+        if (transform._tx == 0 and transform._ty == 0 and
+                transform._rotation == 0 and transform._sf == 1):
+            return self
         return _GTransform(self._tx + transform.get_tx(),
                            self._ty + transform.get_ty(),
                            rotation=self._rotation + transform._rotation,
                            sf=self._sf * transform._sf)
 
+_IDENTITY_TRANSFORM = _GTransform()
+
+# Private class: _GComponentList
+
+class _GComponentList:
+    """
+    This class holds the components of a <code>GCompound</code> in order
+    from back to front.  The components are linked in a circular list
+    whose nodes are found through a table indexed by the identity of
+    each component, so that testing membership, removing a component,
+    and moving it within the order take constant time.  A list of the
+    components is built when needed for iteration or indexing and kept
+    until the order changes.
+    """
+
+    def __init__(self):
+        self._head = [ None, None, None ]
+        self._head[1] = self._head
+        self._head[2] = self._head
+        self._nodes = { }
+        self._list = None
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, gobj):
+        return id(gobj) in self._nodes
+
+    def __iter__(self):
+        return iter(self._get_list())
+
+    def __reversed__(self):
+        return reversed(self._get_list())
+
+    def __getitem__(self, index):
+        return self._get_list()[index]
+
+    def append(self, gobj):
+        if id(gobj) in self._nodes:
+            self.remove(gobj)
+        self.insert(gobj)
+
+    def insert(self, gobj, before=None):
+        if before is None:
+            succ = self._head
+        else:
+            succ = self._nodes[id(before)]
+        pred = succ[1]
+        node = [ gobj, pred, succ ]
+        pred[2] = node
+        succ[1] = node
+        self._nodes[id(gobj)] = node
+        self._list = None
+
+    def remove(self, gobj):
+        node = self._nodes.pop(id(gobj))
+        node[1][2] = node[2]
+        node[2][1] = node[1]
+        self._list = None
+
+    def get_first(self):
+        return self._head[2][0]
+
+    def get_next(self, gobj):
+        return self._nodes[id(gobj)][2][0]
+
+    def get_previous(self, gobj):
+        return self._nodes[id(gobj)][1][0]
+
+    def _get_list(self):
+        if self._list is None:
+            result = [ ]
+            node = self._head[2]
+            while node is not self._head:
+                result.append(node[0])
+                node = node[2]
+            self._list = result
+        return self._list
+
+# Private class: _GSpatialIndex
+
+class _GSpatialIndex:
+    """
+    This class implements a uniform grid over the components of a
+    <code>GCompound</code>.  Each component is recorded in every cell that
+    its bounding box overlaps, enlarged by the hit-testing tolerance, so
+    that any point for which <code>contains</code> can return true lies in
+    one of its cells.  Components that cover many cells are kept in a
+    separate set that every query examines.  The index also records the
+    bounding box of each component so that range queries need not call
+    <code>get_bounds</code>.  Queries order their results using the
+    z-order keys maintained by the compound.
+    """
+
+    DEFAULT_CELL_SIZE = 50
+    MAX_CELLS = 64
+
+    def __init__(self, cell_size):
+        self._cell_size = cell_size
+        self._cells = { }
+        self._entries = { }
+        self._large = set()
+
+    def add(self, gobj):
+        extent, box = self._get_entry(gobj)
+        self._entries[gobj] = (extent, box)
+        if extent is None:
+            self._large.add(gobj)
+        else:
+            cx0, cy0, cx1, cy1 = extent
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = self._cells.get((cx, cy))
+                    if cell is None:
+                        cell = set()
+                        self._cells[(cx, cy)] = cell
+                    cell.add(gobj)
+
+    def remove(self, gobj):
+        if gobj not in self._entries:
+            return
+        extent = self._entries.pop(gobj)[0]
+        if extent is None:
+            self._large.discard(gobj)
+        else:
+            cx0, cy0, cx1, cy1 = extent
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = self._cells[(cx, cy)]
+                    cell.discard(gobj)
+                    if len(cell) == 0:
+                        del self._cells[(cx, cy)]
+
+    def update(self, gobj):
+        if gobj not in self._entries:
+            return
+        entry = self._get_entry(gobj)
+        if entry[0] != self._entries[gobj][0]:
+            self.remove(gobj)
+            self.add(gobj)
+        else:
+            self._entries[gobj] = entry
+
+    def find_top(self, x, y):
+        cs = self._cell_size
+        best = None
+        cell = self._cells.get((math.floor(x / cs), math.floor(y / cs)))
+        if cell is not None:
+            for gobj in cell:
+                if best is None or gobj._zkey > best._zkey:
+                    if gobj.contains(x, y):
+                        best = gobj
+        for gobj in self._large:
+            if best is None or gobj._zkey > best._zkey:
+                if gobj.contains(x, y):
+                    best = gobj
+        return best
+
+    def find_all(self, x, y):
+        cs = self._cell_size
+        result = [ ]
+        cell = self._cells.get((math.floor(x / cs), math.floor(y / cs)))
+        if cell is not None:
+            for gobj in cell:
+                if gobj.contains(x, y):
+                    result.append(gobj)
+        for gobj in self._large:
+            if gobj.contains(x, y):
+                result.append(gobj)
+        result.sort(key=_get_zkey, reverse=True)
+        return result
+
+    def find_in(self, x0, y0, x1, y1):
+        result = [ ]
+        for gobj in self._find_candidates(x0, y0, x1, y1):
+            box = self._entries[gobj][1]
+            if box is not None:
+                if (box[0] <= x1 and x0 <= box[2] and
+                        box[1] <= y1 and y0 <= box[3]):
+                    result.append(gobj)
+        result.sort(key=_get_zkey, reverse=True)
+        return result
+
+    def find_along(self, x, y, ux, uy, max_dist):
+        hits = [ ]
+        x1 = x + ux * max_dist
+        y1 = y + uy * max_dist
+        for gobj in self._find_candidates(min(x, x1), min(y, y1),
+                                          max(x, x1), max(y, y1)):
+            box = self._entries[gobj][1]
+            if box is not None:
+                t = _trace_ray(gobj, x, y, ux, uy, max_dist, box)
+                if t is not None:
+                    hits.append((t, -gobj._zkey, gobj))
+        hits.sort(key=_get_ray_order)
+        return [ hit[2] for hit in hits ]
+
+    def _find_candidates(self, x0, y0, x1, y1):
+        cs = self._cell_size
+        cx0 = math.floor(x0 / cs)
+        cy0 = math.floor(y0 / cs)
+        cx1 = math.floor(x1 / cs)
+        cy1 = math.floor(y1 / cs)
+        candidates = set(self._large)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            for key, cell in self._cells.items():
+                if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1:
+                    candidates.update(cell)
+        else:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = self._cells.get((cx, cy))
+                    if cell is not None:
+                        candidates.update(cell)
+        return candidates
+
+    def _get_entry(self, gobj):
+        """
+        Returns a tuple consisting of the range of cells covered by the
+        object as a tuple (cx0, cy0, cx1, cy1), or <code>None</code> if
+        the object should be kept in the set of large objects, and the
+        bounding box of the object as a tuple (x0, y0, x1, y1).
+        """
+        bounds = gobj.get_bounds()
+        if bounds is None:
+            return None, None
+        box = (bounds._x, bounds._y,
+               bounds._x + bounds._width, bounds._y + bounds._height)
+        cs = self._cell_size
+        tolerance = _HIT_TOLERANCE
+        cx0 = math.floor((box[0] - tolerance) / cs)
+        cy0 = math.floor((box[1] - tolerance) / cs)
+        cx1 = math.floor((box[2] + tolerance) / cs)
+        cy1 = math.floor((box[3] + tolerance) / cs)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.MAX_CELLS:
+            return None, box
+        return (cx0, cy0, cx1, cy1), box
+
+# Private class: _PhotoCache
+
+class _PhotoCache:
+    """
+    This class implements a bounded cache of tkinter images converted from
+    PIL images.  Entries are keyed by the identity of the decoded image
+    together with the effective scale factor and rotation, and the least
+    recently used entry is discarded when the cache is full.  Discarding
+    an entry never affects the display, because each <code>GImage</code>
+    keeps a reference to the tkinter image it is showing.  The optional
+    factory creates the displayable image from a PIL image and defaults
+    to <code>ImageTk.PhotoImage</code>.
+    """
+
+    DEFAULT_CAPACITY = 256
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, factory=None):
+        self._capacity = capacity
+        self._factory = factory
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, image, sf, rotation):
+        key = (id(image), sf, rotation)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is image:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+        self._misses += 1
+        img = image
+        if sf != 1:
+            w = round(img.width * sf)
+            h = round(img.height * sf)
+            img = img.resize((w, h), Image.LANCZOS)
+        if rotation != 0:
+            img = img.rotate(rotation, expand=True)
+        if self._factory is None:
+            photo = ImageTk.PhotoImage(img)
+        else:
+            photo = self._factory(img)
+        self._entries[key] = (image, photo)
+        self._trim()
+        return photo
+
+    def set_capacity(self, capacity):
+        self._capacity = capacity
+        self._trim()
+
+    def get_stats(self):
+        stats = GState()
+        stats.hits = self._hits
+        stats.misses = self._misses
+        stats.size = len(self._entries)
+        stats.capacity = self._capacity
+        return stats
+
+    def _trim(self):
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+# Private class: _DecodedImageCache
+
+class _DecodedImageCache:
+    """
+    This class implements the process-wide store of decoded PIL images
+    used by <code>GImage</code>.  Files are keyed by their absolute path and
+    revalidated against their modification time, so that an edited file
+    is decoded again; URLs are keyed by the URL itself.  The cached images
+    are shared among all <code>GImage</code> objects and must therefore
+    never be modified in place.  When the pixel data in the cache exceeds
+    the byte limit, the least recently used images are discarded.
+    """
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._max_bytes = max_bytes
+
+    def load(self, source):
+        if "://" in source:
+            key = source
+            stamp = None
+        else:
+            key = os.path.abspath(source)
+            stamp = os.stat(key).st_mtime_ns
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            self._entries.move_to_end(key)
+            return entry[1]
+        image = self._decode(source)
+        self.evict(source)
+        self._entries[key] = (stamp, image)
+        self._bytes += self._count_bytes(image)
+        self._trim()
+        return image
+
+    def evict(self, source):
+        if "://" in source:
+            key = source
+        else:
+            key = os.path.abspath(source)
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= self._count_bytes(entry[1])
+
+    def clear(self):
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+
+    def get_bytes(self):
+        return self._bytes
+
+    def set_max_bytes(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._trim()
+
+    def _trim(self):
+        while self._bytes > self._max_bytes and len(self._entries) > 0:
+            entry = self._entries.popitem(last=False)[1]
+            self._bytes -= self._count_bytes(entry[1])
+
+    def _decode(self, source):
+        if "://" in source:
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            with urllib.request.urlopen(source, context=ctx) as req:
+                image = Image.open(io.BytesIO(req.read()))
+        else:
+            image = Image.open(source)
+        image.load()
+        return image
+
+    def _count_bytes(self, image):
+        return image.width * image.height * len(image.getbands())
+
+_decoded_images = _DecodedImageCache()
+
+# Private class: _FontCache
+
+class _FontCache:
+    """
+    This class implements the process-wide store of fonts decoded from
+    font strings.  Entries are keyed by the font string together with the
+    tkinter root for which the font was created, and the least recently
+    used entry is discarded when the cache is full.  Each entry is a
+    <code>_DecodedFont</code> that also remembers the metrics of the font
+    and the widths of the strings measured in it.
+    """
+
+    DEFAULT_CAPACITY = 64
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._capacity = capacity
+        self._entries = collections.OrderedDict()
+
+    def get(self, name):
+        key = (name, getattr(tkinter, "_root", None))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        entry = _DecodedFont(_decode_font(name))
+        self._entries[key] = entry
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries = collections.OrderedDict()
+
+# Private class: _DecodedFont
+
+class _DecodedFont:
+    """
+    This class records a decoded font together with its metrics, which
+    are read in a single call when the entry is created, and a table of
+    the widths of the strings measured in the font.  The table is
+    emptied when it reaches its maximum size.
+    """
+
+    MAX_WIDTHS = 256
+
+    def __init__(self, font):
+        self._font = font
+        metrics = font.metrics()
+        self._ascent = metrics["ascent"]
+        self._descent = metrics["descent"]
+        self._linespace = metrics["linespace"]
+        self._widths = { }
+
+    def measure(self, text):
+        width = self._widths.get(text)
+        if width is None:
+            if len(self._widths) >= self.MAX_WIDTHS:
+                self._widths = { }
+            width = self._font.measure(text)
+            self._widths[text] = width
+        return width
+
+_decoded_fonts = _FontCache()
+
+# Private class: _HeadlessRoot
+
+class _HeadlessRoot:
+    """
+    This class stands in for the tkinter root window in a headless
+    <code>GWindow</code>.  It keeps the queue of callbacks scheduled by
+    <code>after</code>, which are run in order of their due times by
+    <code>update</code> and <code>mainloop</code>.  The main loop returns
+    once no callbacks remain, because a headless window has no other
+    source of events.
+    """
+
+    def __init__(self, width, height):
+        self._screen_width = width
+        self._screen_height = height
+        self._title = ""
+        self._callbacks = { }
+        self._queue = [ ]
+        self._seq = 0
+        self._destroyed = False
+
+    def title(self, title):
+        self._title = title
+
+    def protocol(self, name, fn):
+        pass
+
+    def winfo_screenwidth(self):
+        return self._screen_width
+
+    def winfo_screenheight(self):
+        return self._screen_height
+
+    def after(self, delay, fn, *args):
+        self._seq += 1
+        after_id = "after#" + str(self._seq)
+        self._callbacks[after_id] = (fn, args)
+        heapq.heappush(self._queue, (self._get_clock() + delay,
+                                     self._seq, after_id))
+        return after_id
+
+    def after_cancel(self, after_id):
+        self._callbacks.pop(after_id, None)
+
+    def update(self):
+        now = self._get_clock()
+        last = self._seq
+        queue = self._queue
+        while len(queue) > 0 and queue[0][0] <= now and queue[0][1] <= last:
+            entry = self._callbacks.pop(heapq.heappop(queue)[2], None)
+            if entry is not None:
+                try:
+                    entry[0](*entry[1])
+                except Exception:
+                    self.report_callback_exception(*sys.exc_info())
+
+    def update_idletasks(self):
+        pass
+
+    def mainloop(self):
+        queue = self._queue
+        while not self._destroyed:
+            while len(queue) > 0 and queue[0][2] not in self._callbacks:
+                heapq.heappop(queue)
+            if len(queue) == 0:
+                return
+            delay = queue[0][0] - self._get_clock()
+            if delay > 0:
+                time.sleep(delay / 1000)
+            self.update()
+
+    def destroy(self):
+        self._destroyed = True
+        self._callbacks.clear()
+        self._queue = [ ]
+
+    def report_callback_exception(self, exc, value, tb):
+        sys.stderr.write("Exception in headless callback\n")
+        traceback.print_exception(exc, value, tb)
+
+    def _get_clock(self):
+        return time.monotonic() * 1000
+
+# Private class: _HeadlessCanvas
+
+class _HeadlessCanvas:
+    """
+    This class stands in for the tkinter canvas in a headless
+    <code>GWindow</code>.  It implements the subset of the canvas
+    interface used by pgl, recording each item as a list consisting of
+    its kind, its coordinates, and its options, together with the
+    stacking order of the items from back to front.  The methods that
+    move, configure, or delete items accept either an item id or a tag,
+    which is looked up in an index from each tag to its items.  Event
+    handlers registered with <code>bind</code> are invoked by
+    <code>event_generate</code>, which takes the same event sequences
+    and <code>x</code>, <code>y</code>, and <code>keysym</code> options
+    as the tkinter method.
+    """
+
+    def __init__(self, root, width, height):
+        self._root = root
+        self._width = width
+        self._height = height
+        self._items = { }
+        self._order = [ ]
+        self._tagged = { }
+        self._next_id = 1
+        self._bindings = { }
+
+    def create_arc(self, *coords, **options):
+        return self._create("arc", coords, options)
+
+    def create_image(self, *coords, **options):
+        return self._create("image", coords, options)
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_oval(self, *coords, **options):
+        return self._create("oval", coords, options)
+
+    def create_polygon(self, *coords, **options):
+        return self._create("polygon", coords, options)
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def coords(self, tkid, *coords):
+        item = self._items[tkid]
+        if len(coords) == 0:
+            return list(item[1])
+        if len(coords) == 1:
+            coords = coords[0]
+        item[1] = [ float(c) for c in coords ]
+
+    def move(self, tag, dx, dy):
+        for tkid in self._find(tag):
+            coords = self._items[tkid][1]
+            for i in range(0, len(coords), 2):
+                coords[i] += dx
+                coords[i + 1] += dy
+
+    def itemconfig(self, tag, **options):
+        for tkid in self._find(tag):
+            item_options = self._items[tkid][2]
+            if "tags" in options:
+                self._untag(tkid, item_options.get("tags", ()))
+                self._tag(tkid, options["tags"])
+            item_options.update(options)
+
+    def itemcget(self, tkid, option):
+        return self._items[tkid][2].get(option)
+
+    def type(self, tkid):
+        return self._items[tkid][0]
+
+    def delete(self, *tags):
+        removed = [ ]
+        for tag in tags:
+            for tkid in self._find(tag):
+                item = self._items.pop(tkid, None)
+                if item is not None:
+                    self._untag(tkid, item[2].get("tags", ()))
+                    removed.append(tkid)
+        if len(removed) == 1:
+            self._order.remove(removed[0])
+        elif len(removed) > 1:
+            removed = set(removed)
+            self._order = [ tkid for tkid in self._order
+                            if tkid not in removed ]
+
+    def find_all(self):
+        return tuple(self._order)
+
+    def find_withtag(self, tag):
+        tkids = set(self._find(tag))
+        return tuple(tkid for tkid in self._order if tkid in tkids)
+
+    def tag_raise(self, tag, above=None):
+        tkids = self._take(tag)
+        if above is None:
+            self._order.extend(tkids)
+        else:
+            k = self._order.index(above) + 1
+            self._order[k:k] = tkids
+
+    def tag_lower(self, tag, below=None):
+        tkids = self._take(tag)
+        if below is None:
+            self._order[0:0] = tkids
+        else:
+            k = self._order.index(below)
+            self._order[k:k] = tkids
+
+    def bind(self, sequence, fn):
+        self._bindings[sequence] = fn
+
+    def event_generate(self, sequence, x=0, y=0, keysym=None):
+        fn = self._bindings.get(sequence)
+        if fn is not None:
+            fn(_HeadlessEvent(self, x, y, keysym))
+
+    def focus_set(self):
+        pass
+
+    def pack(self):
+        pass
+
+    def update(self):
+        self._root.update()
+
+    def after(self, delay, fn, *args):
+        return self._root.after(delay, fn, *args)
+
+    def after_cancel(self, after_id):
+        self._root.after_cancel(after_id)
+
+    def _create(self, kind, coords, options):
+        if len(coords) == 1:
+            coords = coords[0]
+        tkid = self._next_id
+        self._next_id += 1
+        self._items[tkid] = [ kind, [ float(c) for c in coords ],
+                              dict(options) ]
+        self._order.append(tkid)
+        self._tag(tkid, options.get("tags", ()))
+        return tkid
+
+    def _take(self, tag):
+        if isinstance(tag, int):
+            self._order.remove(tag)
+            return [ tag ]
+        tkids = self.find_withtag(tag)
+        removed = set(tkids)
+        self._order = [ tkid for tkid in self._order if tkid not in removed ]
+        return list(tkids)
+
+    def _find(self, tag):
+        if isinstance(tag, int):
+            return [ tag ] if tag in self._items else [ ]
+        if tag == "all":
+            return list(self._order)
+        return list(self._tagged.get(tag, ()))
+
+    def _tag(self, tkid, tags):
+        if isinstance(tags, str):
+            tags = tags.split()
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(tkid)
+
+    def _untag(self, tkid, tags):
+        if isinstance(tags, str):
+            tags = tags.split()
+        for tag in tags:
+            tkids = self._tagged.get(tag)
+            if tkids is not None:
+                tkids.discard(tkid)
+                if len(tkids) == 0:
+                    del self._tagged[tag]
+
+# Private class: _HeadlessEvent
+
+class _HeadlessEvent:
+    """
+    This class represents an event delivered by a headless canvas.  It
+    has the fields of a tkinter event that pgl uses.
+    """
+
+    def __init__(self, widget, x, y, keysym):
+        self.widget = widget
+        self.x = x
+        self.y = y
+        self.keysym = keysym if keysym is not None else ""
+        self.char = keysym if keysym is not None and len(keysym) == 1 else ""
+
+# Private class: _HeadlessFont
+
+class _HeadlessFont:
+    """
+    This class stands in for a tkinter <code>Font</code> when no tkinter
+    window exists.  Its metrics are estimated from the pixel size using
+    proportions typical of sans-serif fonts, and its string form is a
+    tkinter font description, so that it can also be used by a tkinter
+    window opened later.
+    """
+
+    ASCENT = 0.9
+    DESCENT = 0.25
+    CHAR_WIDTH = 0.55
+    BOLD_CHAR_WIDTH = 0.6
+
+    def __init__(self, family, size, weight, slant):
+        self._family = family
+        self._size = size
+        self._weight = weight
+        self._slant = slant
+        self._metrics = {
+            "ascent": math.ceil(self.ASCENT * size),
+            "descent": math.ceil(self.DESCENT * size),
+            "linespace": (math.ceil(self.ASCENT * size) +
+                          math.ceil(self.DESCENT * size)),
+            "fixed": 0
+        }
+
+    def metrics(self, *options):
+        if len(options) == 0:
+            return dict(self._metrics)
+        if len(options) == 1:
+            return self._metrics[options[0]]
+        return { key: self._metrics[key] for key in options }
+
+    def measure(self, text):
+        width = self.CHAR_WIDTH
+        if self._weight == "bold":
+            width = self.BOLD_CHAR_WIDTH
+        return round(width * self._size * len(text))
+
+    def __str__(self):
+        return ("{" + self._family + "} " + str(-self._size) + " " +
+                self._weight + " " + self._slant)
+
+# Private class: _HeadlessPhoto
+
+class _HeadlessPhoto:
+    """
+    This class stands in for a tkinter image in a headless window and
+    keeps the PIL image from which it was created.
+    """
+
+    def __init__(self, image):
+        self._image = image
+        self._rgba = None
+
+    def width(self):
+        return self._image.width
+
+    def height(self):
+        return self._image.height
+
+    def _get_rgba(self):
+        if self._rgba is None:
+            self._rgba = self._image.convert("RGBA")
+        return self._rgba
+
+# Private class: _RasterCanvas
+
+class _RasterCanvas(_HeadlessCanvas):
+    """
+    This class extends the headless canvas so that it also draws its
+    items into an RGBA framebuffer.  Every change to an item records the
+    bounding boxes of the item before and after the change as dirty
+    rectangles.  The <code>render</code> method merges the dirty
+    rectangles and redraws only those regions, drawing each item that
+    overlaps a region into a tile that is then pasted into the frame.
+    """
+
+    BACKGROUND = (255, 255, 255, 255)
+    MAX_DIRTY_RECTS = 32
+
+    def __init__(self, root, width, height):
+        _HeadlessCanvas.__init__(self, root, width, height)
+        self._frame = Image.new("RGBA", (width, height), self.BACKGROUND)
+        self._bounds = { }
+        self._dirty = [ ]
+        self._fonts = { }
+        self._colors = { }
+
+    def coords(self, tkid, *coords):
+        if len(coords) == 0:
+            return _HeadlessCanvas.coords(self, tkid)
+        self._invalidate(tkid)
+        _HeadlessCanvas.coords(self, tkid, *coords)
+        self._validate(tkid)
+
+    def move(self, tag, dx, dy):
+        tkids = self._find(tag)
+        for tkid in tkids:
+            self._invalidate(tkid)
+        _HeadlessCanvas.move(self, tag, dx, dy)
+        for tkid in tkids:
+            self._validate(tkid)
+
+    def itemconfig(self, tag, **options):
+        tkids = self._find(tag)
+        for tkid in tkids:
+            self._invalidate(tkid)
+        _HeadlessCanvas.itemconfig(self, tag, **options)
+        for tkid in tkids:
+            self._validate(tkid)
+
+    def delete(self, *tags):
+        for tag in tags:
+            for tkid in self._find(tag):
+                self._invalidate(tkid)
+        _HeadlessCanvas.delete(self, *tags)
+
+    def tag_raise(self, tag, above=None):
+        _HeadlessCanvas.tag_raise(self, tag, above)
+        for tkid in self._find(tag):
+            self._validate(tkid)
+
+    def tag_lower(self, tag, below=None):
+        _HeadlessCanvas.tag_lower(self, tag, below)
+        for tkid in self._find(tag):
+            self._validate(tkid)
+
+    def render(self):
+        for box in self._merge_dirty():
+            self._redraw(box)
+        return self._frame
+
+    def _create(self, kind, coords, options):
+        tkid = _HeadlessCanvas._create(self, kind, coords, options)
+        self._validate(tkid)
+        return tkid
+
+    def _invalidate(self, tkid):
+        box = self._bounds.pop(tkid, None)
+        if box is None:
+            box = self._compute_bounds(self._items[tkid])
+        self._dirty.append(box)
+
+    def _validate(self, tkid):
+        box = self._compute_bounds(self._items[tkid])
+        self._bounds[tkid] = box
+        self._dirty.append(box)
+
+    def _get_bounds(self, tkid):
+        box = self._bounds.get(tkid)
+        if box is None:
+            box = self._compute_bounds(self._items[tkid])
+            self._bounds[tkid] = box
+        return box
+
+    def _compute_bounds(self, item):
+        kind, coords, options = item
+        if kind == "image":
+            photo = options.get("image")
+            if photo is None or len(coords) < 2:
+                return (0, 0, 0, 0)
+            x0 = math.floor(coords[0])
+            y0 = math.floor(coords[1])
+            return (x0, y0, x0 + photo.width() + 1, y0 + photo.height() + 1)
+        if kind == "text":
+            font = options.get("font")
+            if font is None or len(coords) < 2:
+                return (0, 0, 0, 0)
+            x0 = math.floor(coords[0])
+            y1 = math.ceil(coords[1])
+            width = font.measure(options.get("text", ""))
+            height = font.metrics("linespace")
+            return (x0 - 1, y1 - height - 1, x0 + width + 2, y1 + 2)
+        if len(coords) < 2:
+            return (0, 0, 0, 0)
+        pad = math.ceil(options.get("width", 1) / 2) + 1
+        return (math.floor(min(coords[0::2])) - pad,
+                math.floor(min(coords[1::2])) - pad,
+                math.ceil(max(coords[0::2])) + pad + 1,
+                math.ceil(max(coords[1::2])) + pad + 1)
+
+    def _merge_dirty(self):
+        width = self._width
+        height = self._height
+        boxes = [ ]
+        for x0, y0, x1, y1 in self._dirty:
+            x0 = max(x0, 0)
+            y0 = max(y0, 0)
+            x1 = min(x1, width)
+            y1 = min(y1, height)
+            if x0 < x1 and y0 < y1:
+                boxes.append((x0, y0, x1, y1))
+        self._dirty = [ ]
+        if len(boxes) > self.MAX_DIRTY_RECTS:
+            return [ (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                      max(b[2] for b in boxes), max(b[3] for b in boxes)) ]
+        merged = [ ]
+        for box in boxes:
+            i = 0
+            while i < len(merged):
+                other = merged[i]
+                if (box[0] <= other[2] and other[0] <= box[2] and
+                        box[1] <= other[3] and other[1] <= box[3]):
+                    box = (min(box[0], other[0]), min(box[1], other[1]),
+                           max(box[2], other[2]), max(box[3], other[3]))
+                    merged.pop(i)
+                    i = 0
+                else:
+                    i += 1
+            merged.append(box)
+        return merged
+
+    def _redraw(self, box):
+        x0, y0, x1, y1 = box
+        tile = Image.new("RGBA", (x1 - x0, y1 - y0), self.BACKGROUND)
+        draw = ImageDraw.Draw(tile)
+        for tkid in self._order:
+            item = self._items[tkid]
+            if item[2].get("state") == "hidden":
+                continue
+            bx0, by0, bx1, by1 = self._get_bounds(tkid)
+            if bx0 < x1 and x0 < bx1 and by0 < y1 and y0 < by1:
+                self._draw_item(tile, draw, item, x0, y0)
+        self._frame.paste(tile, (x0, y0))
+
+    def _draw_item(self, tile, draw, item, ox, oy):
+        kind, coords, options = item
+        points = [ ]
+        for i in range(0, len(coords) - 1, 2):
+            points.append((coords[i] - ox, coords[i + 1] - oy))
+        fill = self._get_color(options.get("fill", ""))
+        outline = self._get_color(options.get("outline", ""))
+        width = max(1, round(options.get("width", 1)))
+        if kind == "rectangle":
+            draw.rectangle(self._get_box(points), fill=fill,
+                           outline=outline, width=width)
+        elif kind == "oval":
+            draw.ellipse(self._get_box(points), fill=fill,
+                         outline=outline, width=width)
+        elif kind == "arc":
+            start = options.get("start", 0)
+            extent = options.get("extent", 0)
+            angles = (-(start + extent), -start)
+            if extent < 0:
+                angles = (-start, -(start + extent))
+            if options.get("style") == "pieslice":
+                draw.pieslice(self._get_box(points), angles[0], angles[1],
+                              fill=fill, outline=outline, width=width)
+            else:
+                draw.arc(self._get_box(points), angles[0], angles[1],
+                         fill=fill, width=width)
+        elif kind == "line":
+            if len(points) >= 2 and fill is not None:
+                draw.line(points, fill=fill, width=width)
+        elif kind == "polygon":
+            if len(points) >= 3:
+                draw.polygon(points, fill=fill, outline=outline, width=width)
+        elif kind == "text":
+            if fill is not None and len(points) > 0:
+                draw.text(points[0], options.get("text", ""), fill=fill,
+                          font=self._get_font(options.get("font")),
+                          anchor="ld")
+        elif kind == "image":
+            photo = options.get("image")
+            if photo is not None and len(points) > 0:
+                self._draw_image(tile, photo._get_rgba(), points[0])
+
+    def _draw_image(self, tile, image, pt):
+        x = math.floor(pt[0])
+        y = math.floor(pt[1])
+        sx = max(0, -x)
+        sy = max(0, -y)
+        sx1 = min(image.width, tile.width - x)
+        sy1 = min(image.height, tile.height - y)
+        if sx < sx1 and sy < sy1:
+            tile.alpha_composite(image, (x + sx, y + sy),
+                                 (sx, sy, sx1, sy1))
+
+    def _get_box(self, points):
+        xs = [ pt[0] for pt in points ]
+        ys = [ pt[1] for pt in points ]
+        return [ min(xs), min(ys), max(xs), max(ys) ]
+
+    def _get_color(self, name):
+        if name == "" or name is None:
+            return None
+        color = self._colors.get(name)
+        if color is None:
+            try:
+                rgb = _convert_color_to_rgb(name)
+                color = ((rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF,
+                         rgb & 0xFF, 255)
+            except Exception:
+                color = ImageColor.getcolor(name, "RGBA")
+            self._colors[name] = color
+        return color
+
+    def _get_font(self, font):
+        key = str(font)
+        pil_font = self._fonts.get(key)
+        if pil_font is None:
+            size = font.metrics("ascent") + font.metrics("descent")
+            try:
+                pil_font = ImageFont.truetype("DejaVuSans.ttf", size)
+            except Exception:
+                try:
+                    pil_font = ImageFont.load_default(size)
+                except Exception:
+                    pil_font = ImageFont.load_default()
+            self._fonts[key] = pil_font
+        return pil_font
+
+# Private class: _FrameCapture
+
+class _FrameCapture:
+    """
+    This class records the contents of a window.  A timer in the window
+    copies a frame into a bounded queue at the requested rate, and a
+    pool of worker threads takes frames from the queue and encodes them.
+    PNG frames are written by the workers as soon as they are encoded.
+    GIF frames are converted to palette images by the workers and
+    appended to the file in order, which means that a frame is held only
+    until the frames before it have been written.  The memory used by a
+    capture therefore does not grow with its length.
+    """
+
+    WORKERS = 2
+
+    def __init__(self, gw, path, fps, max_queued):
+        self._gw = gw
+        self._path = path
+        self._gif = path.lower().endswith(".gif")
+        if not self._gif:
+            os.makedirs(path, exist_ok=True)
+        self._delay = 1000 / fps
+        self._queue = queue.Queue(max_queued)
+        self._gif_file = None
+        self._gif_pending = { }
+        self._gif_next = 0
+        self._gif_lock = threading.Lock()
+        self._captured = 0
+        self._dropped = 0
+        self._failed = 0
+        self._written = 0
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.WORKERS)
+        self._workers = [ self._executor.submit(self._work)
+                          for i in range(self.WORKERS) ]
+        self._timer = GTimer(gw, self._snapshot, round(self._delay))
+        self._timer.set_repeats(True)
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        for worker in self._workers:
+            self._queue.put(None)
+        self._executor.shutdown(wait=True)
+        for worker in self._workers:
+            worker.result()
+        if self._gif_file is not None:
+            self._gif_file.write(b";")
+            self._gif_file.close()
+            self._gif_file = None
+        return self.get_stats()
+
+    def get_stats(self):
+        stats = GState()
+        with self._lock:
+            stats.captured = self._captured
+            stats.dropped = self._dropped
+            stats.failed = self._failed
+            stats.written = self._written
+        return stats
+
+    def _snapshot(self):
+        if self._queue.full():
+            with self._lock:
+                self._dropped += 1
+            return
+        try:
+            frame = self._grab()
+        except Exception:
+            with self._lock:
+                first = self._failed == 0
+                self._failed += 1
+            if first:
+                self._gw._tk.report_callback_exception(*sys.exc_info())
+            return
+        with self._lock:
+            index = self._captured
+            self._captured += 1
+        self._queue.put((index, frame))
+
+    def _grab(self):
+        gw = self._gw
+        if gw._backend == "raster":
+            return gw.render().copy()
+        if ImageGrab is None:
+            raise ImportError("Screen capture requires the Pillow library")
+        tkc = gw._canvas
+        gw._tk.update_idletasks()
+        x = tkc.winfo_rootx()
+        y = tkc.winfo_rooty()
+        return ImageGrab.grab((x, y, x + gw._window_width,
+                               y + gw._window_height))
+
+    def _work(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            index, frame = entry
+            try:
+                if self._gif:
+                    frame = frame.convert("RGB").quantize()
+                    self._append_gif_frame(index, frame)
+                else:
+                    name = "frame" + str(index).zfill(6) + ".png"
+                    frame.save(os.path.join(self._path, name))
+                    with self._lock:
+                        self._written += 1
+            except Exception:
+                with self._lock:
+                    self._failed += 1
+                if self._gif:
+                    self._append_gif_frame(index, None)
+
+    def _append_gif_frame(self, index, frame):
+        with self._gif_lock:
+            pending = self._gif_pending
+            pending[index] = frame
+            while self._gif_next in pending:
+                frame = pending.pop(self._gif_next)
+                self._gif_next += 1
+                if frame is not None:
+                    self._write_gif_frame(frame)
+
+    def _write_gif_frame(self, frame):
+        duration = round(self._delay)
+        if self._gif_file is None:
+            self._gif_file = open(self._path, "wb")
+            info = { "loop": 0, "duration": duration }
+            header = GifImagePlugin.getheader(frame, info=info)[0]
+            for data in header:
+                self._gif_file.write(data)
+        for data in GifImagePlugin.getdata(frame, duration=duration,
+                                           include_color_table=True):
+            self._gif_file.write(data)
+        with self._lock:
+            self._written += 1
+
 # Private class: _EventManager
 
 class _EventManager:
@@ -3367,12 +6198,12 @@ class _EventManager:
         self._down_x = tke.x
         self._down_y = tke.y
         self._down_time = time.time()
-        e = GMouseEvent(tke)
+        e = GMouseEvent(tke, self._gw._tk)
         for fn in self._mousedown_listeners:
             fn(e)
 
     def _release_action(self, tke):
-        e = GMouseEvent(tke)
+        e = GMouseEvent(tke, self._gw._tk)
         for fn in self._mouseup_listeners:
             fn(e)
         if abs(self._down_x - e._x) <= self.CLICK_MAX_DISTANCE:
@@ -3390,17 +6221,17 @@ class _EventManager:
                             self._last_click_time = None
 
     def _motion_action(self, tke):
-        e = GMouseEvent(tke)
+        e = GMouseEvent(tke, self._gw._tk)
         for fn in self._mousemove_listeners:
             fn(e)
 
     def _drag_action(self, tke):
-        e = GMouseEvent(tke)
+        e = GMouseEvent(tke, self._gw._tk)
         for fn in self._drag_listeners:
             fn(e)
 
     def _key_action(self, tke):
-        e = GKeyEvent(tke)
+        e = GKeyEvent(tke, self._gw._tk)
         for fn in self._key_listeners:
             fn(e)
 
@@ -3462,6 +6293,8 @@ class _EventManager:
 
 __LINE_TOLERANCE__ = 2
 __ARC_TOLERANCE__ = 2
+_HIT_TOLERANCE = max(__LINE_TOLERANCE__, __ARC_TOLERANCE__) + 1
+_RAY_STEP = 0.5
 
 # Color table
 
@@ -3629,6 +6462,10 @@ COLOR_TABLE = {
     "color.pink": 0xFFAFAF
 }
 
+_CANONICAL_COLORS = {
+    name: _convert_rgb_to_color(rgb) for name, rgb in COLOR_TABLE.items()
+}
+
 # Check for successful compilation
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest
+
+from pgl import GWindow
+
+
+@pytest.fixture
+def image_path():
+    return os.path.join(ROOT, "alien1.png")
+
+
+@pytest.fixture
+def make_window():
+    windows = [ ]
+
+    def make(width=400, height=300, **options):
+        options.setdefault("backend", "headless")
+        gw = GWindow(width, height, **options)
+        windows.append(gw)
+        return gw
+
+    yield make
+    for gw in windows:
+        gw.close()
+
+
+@pytest.fixture(params=[ False, True ], ids=[ "linear", "indexed" ])
+def indexed(request):
+    return request.param
@@ -0,0 +1,76 @@
+import pytest
+
+from pgl import GCompound, GLabel, GLine, GOval, GRect
+
+
+def make_objects():
+    objects = [ ]
+    for i in range(20):
+        if i % 4 == 0:
+            gobj = GRect(15 * i, 10 + 5 * i, 40, 30)
+        elif i % 4 == 1:
+            gobj = GOval(15 * i, 20, 35, 45)
+        elif i % 4 == 2:
+            gobj = GLine(15 * i, 0, 15 * i + 30, 60)
+        else:
+            gobj = GLabel("L" + str(i), 15 * i, 80)
+        objects.append(gobj)
+    return objects
+
+
+def build(make_window, bulk, nested):
+    gw = make_window(400, 200)
+    target = gw._base
+    if nested:
+        target = GCompound()
+        gw.add(target, 5, 5)
+    target.set_spatial_index(True)
+    objects = make_objects()
+    if bulk:
+        target.add_all(objects)
+    else:
+        for gobj in objects:
+            target.add(gobj)
+    return gw, target, objects
+
+
+def describe(gw, target, objects):
+    canvas = gw._canvas
+    position = { gobj._tkid: i for i, gobj in enumerate(objects) }
+    order = [ position[tkid] for tkid in canvas.find_all()
+              if tkid in position ]
+    items = [ (canvas.coords(gobj._tkid), canvas._items[gobj._tkid][0])
+              for gobj in objects ]
+    hits = [ ]
+    for x in range(0, 400, 7):
+        for y in range(0, 120, 7):
+            hits.append([ objects.index(gobj)
+                          for gobj in target.get_elements_at(x, y) ])
+    return order, items, hits
+
+
+@pytest.mark.parametrize("nested", [False, True])
+def test_add_all_matches_repeated_add(make_window, nested):
+    bulk = describe(*build(make_window, True, nested))
+    single = describe(*build(make_window, False, nested))
+    assert bulk == single
+    assert bulk[0] == list(range(20))
+
+
+def test_add_all_rejects_objects_with_a_parent(make_window):
+    gw = make_window(200, 200)
+    owned = GRect(0, 0, 5, 5)
+    other = GCompound()
+    other.add(owned)
+    fresh = GOval(0, 0, 5, 5)
+    with pytest.raises(Exception):
+        gw.add_all([ fresh, owned ])
+    with pytest.raises(Exception):
+        gw.add_all([ fresh, fresh ])
+    assert gw._base.get_element_count() == 0
+    assert fresh.get_parent() is None
+    assert owned.get_parent() is other
+    gw.add_all([ fresh ])
+    with pytest.raises(Exception):
+        gw.add_all([ fresh ])
+    assert gw._base.get_element_count() == 1
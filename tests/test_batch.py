@@ -0,0 +1,57 @@
+from pgl import GImage, GRect
+
+
+def test_scaled_image_is_hit_after_commit(make_window, image_path, indexed):
+    gw = make_window(600, 600)
+    gw._base.set_spatial_index(indexed)
+    img = GImage(image_path)
+    gw.add(img, 10, 10)
+    gw.begin_batch()
+    img.scale(8)
+    assert img.get_width() == round(img._image.width * 8)
+    gw.commit_batch()
+    x = 10 + img.get_width() - 5
+    y = 10 + img.get_height() - 5
+    assert gw.get_element_at(x, y) is img
+    assert gw.get_elements_in(x, y, 1, 1) == [ img ]
+
+
+def test_rotated_image_is_hit_after_commit(make_window, image_path,
+                                           indexed):
+    gw = make_window(600, 600)
+    gw._base.set_spatial_index(indexed)
+    img = GImage(image_path)
+    gw.add(img, 100, 100)
+    width = img.get_width()
+    height = img.get_height()
+    gw.begin_batch()
+    img.rotate(90)
+    gw.commit_batch()
+    assert (img.get_width(), img.get_height()) == (height, width)
+    assert gw.get_element_at(100 + height - 1, 100 + width - 1) is img
+
+
+def test_batch_applies_net_change_once(make_window):
+    gw = make_window(200, 200)
+    rect = GRect(10, 10, 20, 20)
+    gw.add(rect)
+    gw.begin_batch()
+    for i in range(10):
+        rect.move(1, 2)
+    assert gw._canvas.coords(rect._tkid) == [ 10.0, 10.0, 30.0, 30.0 ]
+    gw.commit_batch()
+    assert gw._canvas.coords(rect._tkid) == [ 20.0, 30.0, 40.0, 50.0 ]
+
+
+def test_image_size_is_current_throughout_batch(make_window, image_path):
+    gw = make_window(600, 600)
+    img = GImage(image_path)
+    gw.add(img, 0, 0)
+    width = img.get_width()
+    gw.begin_batch()
+    img.scale(3)
+    assert img.get_width() == width * 3
+    assert img.contains(width * 3 - 1, 1)
+    assert gw.get_element_at(width * 3 - 1, 1) is img
+    gw.commit_batch()
+    assert img.get_width() == width * 3
@@ -0,0 +1,57 @@
+from PIL import Image
+
+from pgl import GRect
+
+
+def test_grab_failures_are_counted_and_reported(make_window, tmp_path):
+    gw = make_window(100, 80, backend="raster", clock="virtual")
+    gw.add(GRect(10, 10, 20, 20))
+    reports = [ ]
+    gw._tk.report_callback_exception = \
+        lambda exc, value, tb: reports.append(value)
+    gw.start_capture(str(tmp_path / "frames"), fps=50)
+    capture = gw._capture
+    grab = capture._grab
+    calls = [ ]
+
+    def flaky_grab():
+        calls.append(None)
+        if len(calls) % 2 == 0:
+            raise RuntimeError("grab " + str(len(calls)))
+        return grab()
+
+    capture._grab = flaky_grab
+    gw.advance(200)
+    stats = gw.stop_capture()
+    assert stats.captured == 5
+    assert stats.failed == 5
+    assert stats.dropped == 0
+    assert stats.written == 5
+    assert len(reports) == 1
+    assert str(reports[0]) == "grab 2"
+    assert len(list((tmp_path / "frames").iterdir())) == 5
+
+
+def test_gif_frames_are_written_in_order(make_window, tmp_path):
+    gw = make_window(60, 40, backend="raster", clock="virtual")
+    rect = GRect(0, 0, 10, 40)
+    rect.set_filled(True)
+    rect.set_color("red")
+    gw.add(rect)
+    gw.set_interval(lambda: rect.move(10, 0), 50)
+    path = str(tmp_path / "movie.gif")
+    gw.start_capture(path, fps=20)
+    capture = gw._capture
+    gw.advance(250)
+    stats = gw.stop_capture()
+    assert stats.captured == stats.written == 5
+    assert stats.dropped == stats.failed == 0
+    assert capture._gif_pending == { }
+    movie = Image.open(path)
+    assert movie.n_frames == 5
+    assert movie.info["duration"] == 50
+    for i in range(5):
+        movie.seek(i)
+        frame = movie.convert("RGB")
+        assert frame.getpixel((10 * i + 15, 20)) == (255, 0, 0)
+        assert frame.getpixel((10 * i + 5, 20)) == (255, 255, 255)
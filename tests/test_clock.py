@@ -0,0 +1,72 @@
+import pytest
+
+
+@pytest.fixture
+def virtual_window(make_window):
+    return lambda: make_window(100, 100, clock="virtual")
+
+
+def test_advance_fires_timers_in_due_order(virtual_window):
+    gw = virtual_window()
+    log = [ ]
+    gw.set_timeout(lambda: log.append(("c", gw.get_time())), 30)
+    gw.set_timeout(lambda: log.append(("a", gw.get_time())), 10)
+    gw.set_timeout(lambda: log.append(("b1", gw.get_time())), 20)
+    gw.set_timeout(lambda: log.append(("b2", gw.get_time())), 20)
+    gw.set_interval(lambda: log.append(("i", gw.get_time())), 15)
+    gw.advance(45)
+    assert log == [ ("a", 10), ("i", 15), ("b1", 20), ("b2", 20),
+                    ("c", 30), ("i", 30), ("i", 45) ]
+    assert gw.get_time() == 45
+    gw.advance(5)
+    assert gw.get_time() == 50
+    assert log[-1] == ("i", 45)
+
+
+def test_timer_started_in_callback_waits_for_its_delay(virtual_window):
+    gw = virtual_window()
+    log = [ ]
+
+    def first():
+        log.append(("first", gw.get_time()))
+        gw.set_timeout(lambda: log.append(("second", gw.get_time())), 0)
+
+    gw.set_timeout(first, 10)
+    gw.set_timeout(lambda: log.append(("other", gw.get_time())), 10)
+    gw.advance(10)
+    assert log == [ ("first", 10), ("other", 10), ("second", 10) ]
+
+
+def test_run_until_stops_when_predicate_holds(virtual_window):
+    gw = virtual_window()
+    count = [ 0 ]
+
+    def tick():
+        count[0] += 1
+
+    gw.set_interval(tick, 25)
+    assert gw.run_until(lambda: count[0] == 4)
+    assert count[0] == 4
+    assert gw.get_time() == 100
+    assert gw.run_until(lambda: True)
+    assert gw.get_time() == 100
+
+
+def test_run_until_respects_limits(virtual_window):
+    gw = virtual_window()
+    ticks = [ ]
+    gw.set_interval(lambda: ticks.append(gw.get_time()), 25)
+    assert not gw.run_until(lambda: False, max_time=60)
+    assert ticks == [ 25, 50 ]
+    assert gw.get_time() == 60
+    idle = virtual_window()
+    assert not idle.run_until(lambda: False)
+    assert idle.get_time() == 0
+
+
+def test_advance_requires_virtual_clock(make_window):
+    gw = make_window(100, 100)
+    with pytest.raises(Exception):
+        gw.advance(10)
+    with pytest.raises(Exception):
+        gw.run_until(lambda: True)
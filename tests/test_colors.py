@@ -0,0 +1,40 @@
+import pytest
+
+import pgl
+from pgl import GRect, GWindow
+
+
+def test_equivalent_specifications_normalize_alike():
+    rgb = GWindow.convert_color_to_rgb("lightgray")
+    spellings = [ "lightgray", "LightGray", "LIGHT_GRAY", "light gray",
+                  "#d3d3d3", "#D3D3D3", GWindow.convert_rgb_to_color(rgb) ]
+    rect = GRect(10, 10)
+    for i in range(2):
+        for color in spellings:
+            rect.set_color(color)
+            assert rect.get_color() == "#D3D3D3"
+            rect.set_fill_color(color)
+            assert rect.get_fill_color() == "#D3D3D3"
+
+
+def test_precomputed_names_match_conversion():
+    for name in pgl.COLOR_TABLE:
+        rgb = pgl._convert_color_to_rgb(name)
+        assert pgl._decode_color(name) == pgl._convert_rgb_to_color(rgb)
+
+
+@pytest.mark.parametrize("color", [ "notacolor", "#GG0000", "re d?" ])
+def test_invalid_colors_still_raise(color):
+    rect = GRect(10, 10)
+    for i in range(2):
+        with pytest.raises(Exception):
+            rect.set_color(color)
+    assert color not in pgl._decoded_colors
+    assert rect.get_color() == "Black"
+
+
+def test_memo_is_bounded():
+    for i in range(3 * pgl._MAX_DECODED_COLORS):
+        spec = "#{:06X}".format(i)
+        assert pgl._decode_color(spec) == spec
+    assert len(pgl._decoded_colors) <= pgl._MAX_DECODED_COLORS
@@ -0,0 +1,115 @@
+import pytest
+
+from pgl import GCompound, GRect, GOval, GLine, GPolygon
+
+
+def build_scene():
+    outer = GCompound()
+    inner = GCompound()
+    shapes = [ GRect(10, 10, 20, 30), GOval(5, 5, 15, 10) ]
+    for gobj in shapes:
+        outer.add(gobj)
+    line = GLine(1, 2, 30, 40)
+    triangle = GPolygon()
+    triangle.add_vertex(0, 0)
+    triangle.add_vertex(10, 0)
+    triangle.add_vertex(5, 8)
+    inner.add(line)
+    inner.add(triangle)
+    inner.set_location(15, 25)
+    outer.add(inner)
+    outer.set_location(100, 80)
+    return outer, inner, shapes + [ line, triangle ]
+
+
+def apply_changes(outer, inner):
+    outer.move(7, -3)
+    inner.move(-2, 4)
+    outer.rotate(30)
+    inner.scale(2)
+    outer.move(1, 1)
+
+
+def item_coords(gw, shapes):
+    return [ gw._canvas.coords(gobj._tkid) for gobj in shapes ]
+
+
+def assert_same_coords(actual, expected):
+    for coords, want in zip(actual, expected):
+        assert coords == pytest.approx(want)
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_incremental_changes_match_fresh_install(make_window, batched):
+    gw = make_window(400, 400)
+    outer, inner, shapes = build_scene()
+    gw.add(outer)
+    if batched:
+        with gw.batch():
+            apply_changes(outer, inner)
+    else:
+        apply_changes(outer, inner)
+    fresh = make_window(400, 400)
+    outer2, inner2, shapes2 = build_scene()
+    apply_changes(outer2, inner2)
+    fresh.add(outer2)
+    assert_same_coords(item_coords(gw, shapes), item_coords(fresh, shapes2))
+
+
+def test_compound_move_is_one_canvas_call(make_window):
+    gw = make_window(400, 400)
+    outer, inner, shapes = build_scene()
+    gw.add(outer)
+    calls = [ ]
+    move = gw._canvas.move
+    gw._canvas.move = lambda *args: (calls.append(args), move(*args))
+    outer.move(5, 6)
+    inner.move(1, 1)
+    assert calls == [ (outer._tag, 5, 6), (inner._tag, 1, 1) ]
+
+
+def test_rotation_in_batch_reinstalls_only_the_compound(make_window):
+    gw = make_window(400, 400)
+    outer, inner, shapes = build_scene()
+    gw.add(outer)
+    bystander = GRect(0, 0, 5, 5)
+    gw.add(bystander)
+    gw.begin_batch()
+    inner.rotate(45)
+    assert not gw._batch_rebuild
+    gw.commit_batch()
+    assert gw._canvas.coords(bystander._tkid) == [ 0.0, 0.0, 5.0, 5.0 ]
+
+
+def test_rotation_keeps_spatial_index():
+    outer, inner, shapes = build_scene()
+    outer.set_spatial_index(True)
+    index = outer._index
+    outer.rotate(90)
+    outer.scale(2)
+    assert outer._index is index
+
+
+def test_scale_changes_bounds_and_contains():
+    gc = GCompound()
+    gc.add(GRect(10, 20, 30, 40))
+    gc.set_location(100, 100)
+    gc.scale(2)
+    bounds = gc.get_bounds()
+    assert (bounds.get_x(), bounds.get_y()) == (120, 140)
+    assert (bounds.get_width(), bounds.get_height()) == (60, 80)
+    assert gc.contains(175, 215)
+    assert not gc.contains(115, 135)
+    gc.scale(0.5)
+    assert gc.get_bounds().get_width() == 30
+
+
+def test_scaled_compound_draws_scaled_items(make_window):
+    gw = make_window(400, 400)
+    gc = GCompound()
+    rect = GRect(10, 20, 30, 40)
+    gc.add(rect)
+    gw.add(gc, 100, 100)
+    gc.scale(2)
+    assert gw._canvas.coords(rect._tkid) == pytest.approx(
+        [ 120, 140, 180, 220 ])
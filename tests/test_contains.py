@@ -0,0 +1,38 @@
+import pytest
+
+from pgl import (GArc, GCompound, GImage, GLabel, GLine, GOval, GPoint,
+                 GPolygon, GRect, GRectangle)
+
+
+def make_shapes(image_path):
+    triangle = GPolygon()
+    triangle.add_vertex(0, 0)
+    triangle.add_vertex(40, 0)
+    triangle.add_vertex(20, 30)
+    triangle.set_location(10, 10)
+    group = GCompound()
+    group.add(GRect(0, 0, 20, 20))
+    group.set_location(15, 15)
+    arc = GArc(10, 10, 40, 40, 0, 360)
+    arc.set_filled(True)
+    return [ GRect(10, 10, 40, 40), GOval(10, 10, 40, 40), group, arc,
+             GLine(10, 10, 50, 50), triangle, GImage(image_path, 10, 10),
+             GLabel("Hello", 10, 30), GRectangle(10, 10, 40, 40) ]
+
+
+@pytest.mark.parametrize("point", [ (25, 20), (200, 200) ])
+def test_contains_accepts_every_point_form(image_path, point):
+    x, y = point
+    for gobj in make_shapes(image_path):
+        expected = gobj.contains(x, y)
+        assert gobj.contains(GPoint(x, y)) == expected, gobj
+        assert gobj.contains({ "x": x, "y": y }) == expected, gobj
+
+
+def test_fast_paths_match_bounds(image_path):
+    shapes = make_shapes(image_path)
+    for gobj in [ shapes[0], shapes[6], shapes[7] ]:
+        bounds = gobj.get_bounds()
+        for x in range(0, 80, 3):
+            for y in range(0, 80, 3):
+                assert gobj.contains(x, y) == bounds.contains(x, y)
@@ -0,0 +1,62 @@
+import pytest
+
+import pgl
+from pgl import GLabel
+
+
+@pytest.fixture
+def font_calls(monkeypatch):
+    pgl._decoded_fonts.clear()
+    calls = { "decode": 0, "metrics": 0, "measure": 0 }
+    decode = pgl._decode_font
+    metrics = pgl._HeadlessFont.metrics
+    measure = pgl._HeadlessFont.measure
+
+    def count(name, fn):
+        def wrapper(*args):
+            calls[name] += 1
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(pgl, "_decode_font", count("decode", decode))
+    monkeypatch.setattr(pgl._HeadlessFont, "metrics",
+                        count("metrics", metrics))
+    monkeypatch.setattr(pgl._HeadlessFont, "measure",
+                        count("measure", measure))
+    yield calls
+    pgl._decoded_fonts.clear()
+
+
+def test_repeated_measurements_hit_the_cache(font_calls):
+    # Each count includes the default font of the new labels.
+    labels = [ GLabel("SCORE: 100") for i in range(5) ]
+    for label in labels:
+        label.set_font("bold 20px 'Sans'")
+    assert font_calls["decode"] == 2
+    assert font_calls["metrics"] == 2
+    widths = set()
+    for i in range(10):
+        for label in labels:
+            widths.add(label.get_width())
+            label.get_ascent()
+            label.get_descent()
+            label.get_height()
+    assert len(widths) == 1
+    assert font_calls["measure"] == 1
+    assert all(label._decoded_font is labels[0]._decoded_font
+               for label in labels)
+
+
+def test_set_font_and_set_label_invalidate_measurements(font_calls):
+    label = GLabel("LIVES: 3")
+    label.set_font("12px 'Sans'")
+    small = (label.get_width(), label.get_ascent(), label.get_height())
+    label.set_font("24px 'Sans'")
+    large = (label.get_width(), label.get_ascent(), label.get_height())
+    assert all(b > a for a, b in zip(small, large))
+    assert font_calls["decode"] == 3
+    label.set_label("LIVES: 33")
+    assert label.get_width() > large[0]
+    label.set_font("12px 'Sans'")
+    assert font_calls["decode"] == 3
+    assert label.get_height() == small[2]
@@ -0,0 +1,24 @@
+import tkinter
+
+from pgl import GWindow
+
+
+def test_event_source_is_the_headless_root(make_window):
+    gw = make_window(200, 100)
+    events = [ ]
+    gw.add_event_listener("mousedown", events.append)
+    gw.add_event_listener("key", events.append)
+    gw._canvas.event_generate("<ButtonPress-1>", x=12, y=34)
+    gw._canvas.event_generate("<Key>", keysym="a")
+    assert len(events) == 2
+    assert (events[0].get_x(), events[0].get_y()) == (12, 34)
+    assert events[0].get_source() is gw._tk
+    assert events[1].get_key() == "a"
+    assert events[1].get_source() is gw._tk
+
+
+def test_screen_size_comes_from_the_headless_root(make_window):
+    gw = make_window(320, 240)
+    assert not hasattr(tkinter, "_root")
+    assert GWindow.get_screen_width() == gw._tk.winfo_screenwidth()
+    assert GWindow.get_screen_height() == gw._tk.winfo_screenheight()
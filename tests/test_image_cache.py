@@ -0,0 +1,73 @@
+import os
+import shutil
+
+import pytest
+
+from pgl import GImage, _decoded_images
+
+
+@pytest.fixture
+def image_copies(tmp_path, image_path):
+    paths = [ ]
+    for name in ("first.png", "second.png"):
+        path = str(tmp_path / name)
+        shutil.copy(image_path, path)
+        paths.append(path)
+    GImage.clear_image_cache()
+    yield paths
+    GImage.set_image_cache_limit(_decoded_images.DEFAULT_MAX_BYTES)
+    GImage.clear_image_cache()
+
+
+def image_bytes(img):
+    return img._image.width * img._image.height * len(img._image.getbands())
+
+
+def test_images_share_one_decoded_buffer(make_window, image_copies):
+    path = image_copies[0]
+    windows = [ make_window(100, 100) for i in range(2) ]
+    images = [ GImage(path) for gw in windows ]
+    for gw, img in zip(windows, images):
+        gw.add(img)
+    assert images[0]._image is images[1]._image
+    assert GImage.get_image_cache_bytes() == image_bytes(images[0])
+
+
+def test_shared_images_reuse_one_photo(make_window, image_copies):
+    gw = make_window(400, 400)
+    images = [ GImage(image_copies[0]) for i in range(5) ]
+    for i, img in enumerate(images):
+        gw.add(img, 10 * i, 0)
+    stats = gw.get_photo_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (4, 1, 1)
+    assert len({ id(img._photo) for img in images }) == 1
+
+
+def test_modified_file_is_decoded_again(image_copies):
+    path = image_copies[0]
+    first = GImage(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    second = GImage(path)
+    assert second._image is not first._image
+    assert GImage(path)._image is second._image
+    assert GImage.get_image_cache_bytes() == image_bytes(second)
+
+
+def test_byte_limit_evicts_least_recently_used(image_copies):
+    first = GImage(image_copies[0])
+    size = image_bytes(first)
+    GImage.set_image_cache_limit(size + 1)
+    second = GImage(image_copies[1])
+    assert GImage.get_image_cache_bytes() == size
+    assert GImage(image_copies[1])._image is second._image
+    assert GImage(image_copies[0])._image is not first._image
+    assert GImage.get_image_cache_bytes() == size
+
+
+def test_evict_removes_one_source(image_copies):
+    first = GImage(image_copies[0])
+    GImage(image_copies[1])
+    GImage.evict_cached_image(image_copies[1])
+    assert GImage.get_image_cache_bytes() == image_bytes(first)
+    assert GImage(image_copies[0])._image is first._image
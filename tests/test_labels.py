@@ -0,0 +1,44 @@
+from pgl import GBoundLabel
+
+
+def record_itemconfig(gw, monkeypatch):
+    calls = [ ]
+    itemconfig = gw._canvas.itemconfig
+
+    def recorder(tkid, **options):
+        calls.append((tkid, options))
+        return itemconfig(tkid, **options)
+
+    monkeypatch.setattr(gw._canvas, "itemconfig", recorder)
+    return calls
+
+
+def test_bound_label_changes_only_when_value_changes(make_window, monkeypatch):
+    gw = make_window(200, 100)
+    score = [ 0 ]
+    label = GBoundLabel(lambda: score[0], "SCORE: {:>5}", 10, 20)
+    gw.add(label)
+    calls = record_itemconfig(gw, monkeypatch)
+    for i in range(10):
+        assert not label.refresh()
+    assert calls == [ ]
+    score[0] = 150
+    assert label.refresh()
+    assert label.get_label() == "SCORE:   150"
+    assert len(calls) == 1
+    assert calls[0][0] == label._tkid
+    assert calls[0][1]["text"] == "SCORE:   150"
+    assert gw._canvas.itemcget(label._tkid, "text") == "SCORE:   150"
+    assert not label.refresh()
+    assert len(calls) == 1
+
+
+def test_bound_label_provider_and_format(make_window):
+    gw = make_window(200, 100)
+    label = GBoundLabel(lambda: 3, "LIVES: {}")
+    gw.add(label, 10, 20)
+    label.set_provider(lambda: 2)
+    assert label.get_label() == "LIVES: 2"
+    label.set_format("{} left")
+    assert label.get_label() == "2 left"
+    assert gw._canvas.itemcget(label._tkid, "text") == "2 left"
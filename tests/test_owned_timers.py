@@ -0,0 +1,36 @@
+from pgl import GCompound, GOval, GRect
+
+
+def test_remove_all_releases_owned_timers(make_window):
+    gw = make_window(100, 100)
+    group = GCompound()
+    gw.add(group)
+    ticks = [ ]
+    rects = [ GRect(i, i, 5, 5) for i in range(10) ]
+    for rect in rects:
+        group.add(rect)
+        rect.set_interval(lambda: ticks.append(1), 0)
+    gw._run_frame()
+    assert len(ticks) == 10
+    rects[0].set_timeout(lambda: ticks.append(2), 0, keep_alive=True)
+    assert gw.get_active_timer_count() == 11
+    group.remove_all()
+    assert gw.get_active_timer_count() == 1
+    assert all(rect._owned_timers == set() for rect in rects[1:])
+    gw._run_frame()
+    assert ticks == [ 1 ] * 10 + [ 2 ]
+    assert gw.get_active_timer_count() == 0
+
+
+def test_remove_and_clear_stop_owned_timers(make_window):
+    gw = make_window(100, 100)
+    rect = GRect(0, 0, 5, 5)
+    oval = GOval(0, 0, 5, 5)
+    gw.add(rect)
+    gw.add(oval)
+    rect.set_interval(lambda: None, 10)
+    oval.set_timeout(lambda: None, 10)
+    gw.remove(rect)
+    assert gw.get_active_timer_count() == 1
+    gw.clear()
+    assert gw.get_active_timer_count() == 0
@@ -0,0 +1,38 @@
+from pgl import GImage
+
+
+def test_photo_cache_counts_hits_and_misses(make_window, image_path):
+    gw = make_window(400, 400)
+    img = GImage(image_path)
+    gw.add(img)
+    shown = img._photo
+    gw.remove(img)
+    gw.add(img, 10, 0)
+    stats = gw.get_photo_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+    assert img._photo is shown
+    img.scale(2)
+    stats = gw.get_photo_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 2, 2)
+    img.scale(0.5)
+    stats = gw.get_photo_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (2, 2, 2)
+    assert img._photo is shown
+
+
+def test_photo_cache_capacity_evicts_oldest(make_window, image_path):
+    gw = make_window(400, 400)
+    gw.set_photo_cache_capacity(2)
+    img = GImage(image_path)
+    gw.add(img)
+    img.scale(2)
+    img.scale(2)
+    stats = gw.get_photo_cache_stats()
+    assert (stats.misses, stats.size, stats.capacity) == (3, 2, 2)
+    img.scale(0.25)
+    stats = gw.get_photo_cache_stats()
+    assert (stats.hits, stats.misses, stats.size) == (0, 4, 2)
+    shown = img._photo
+    gw.set_photo_cache_capacity(0)
+    assert gw.get_photo_cache_stats().size == 0
+    assert img._photo is shown
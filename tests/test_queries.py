@@ -0,0 +1,58 @@
+from pgl import GCompound, GLine, GOval, GRect
+
+
+def make_scene(indexed):
+    scene = GCompound()
+    scene.set_spatial_index(indexed)
+    return scene
+
+
+def test_ray_grazing_oval_corner_misses(indexed):
+    scene = make_scene(indexed)
+    oval = GOval(100, 100, 40, 40)
+    scene.add(oval)
+    # The diagonal passes through the corner of the bounding box only.
+    assert scene.raycast(90, 110, 1, -1, 100) == []
+    assert scene.raycast(90, 120, 1, 0, 100) == [oval]
+
+
+def test_ray_along_right_and_bottom_edges_misses(indexed):
+    scene = make_scene(indexed)
+    rect = GRect(100, 100, 40, 40)
+    scene.add(rect)
+    assert scene.raycast(140, 50, 0, 1, 200) == []
+    assert scene.raycast(50, 140, 1, 0, 200) == []
+    assert scene.raycast(100, 50, 0, 1, 200) == [rect]
+    assert scene.raycast(50, 100, 1, 0, 200) == [rect]
+
+
+def test_ray_hits_agree_with_get_element_at(indexed):
+    scene = make_scene(indexed)
+    shapes = [ GRect(20, 20, 60, 30), GOval(50, 40, 80, 50),
+               GLine(10, 200, 300, 120), GRect(150, 100, 20, 150) ]
+    for gobj in shapes:
+        scene.add(gobj)
+    for y in range(0, 300, 7):
+        hits = scene.raycast(0, y + 0.25, 1, 0, 400)
+        expected = [ ]
+        for i in range(0, 800):
+            for gobj in scene.get_elements_at(i * 0.5, y + 0.25):
+                if gobj not in expected:
+                    expected.append(gobj)
+        assert hits == expected
+
+
+def test_indexed_and_linear_rays_agree():
+    scenes = [ make_scene(False), make_scene(True) ]
+    shapes = [ [ ], [ ] ]
+    for scene, added in zip(scenes, shapes):
+        for i in range(12):
+            oval = GOval(15 + 29 * i, 20 + 19 * i, 35, 25)
+            scene.add(oval)
+            added.append(oval)
+    for dx, dy in [ (1, 1), (2, 1), (1, 3), (-1, 2) ]:
+        linear = [ shapes[0].index(gobj)
+                   for gobj in scenes[0].raycast(200, 0, dx, dy, 500) ]
+        indexed = [ shapes[1].index(gobj)
+                    for gobj in scenes[1].raycast(200, 0, dx, dy, 500) ]
+        assert linear == indexed
@@ -0,0 +1,51 @@
+from pgl import GRect
+
+RED = (255, 0, 0, 255)
+WHITE = (255, 255, 255, 255)
+
+
+def record_redraws(gw, monkeypatch):
+    boxes = [ ]
+    redraw = gw._canvas._redraw
+
+    def recorder(box):
+        boxes.append(box)
+        redraw(box)
+
+    monkeypatch.setattr(gw._canvas, "_redraw", recorder)
+    return boxes
+
+
+def make_scene(make_window):
+    gw = make_window(200, 100, backend="raster")
+    rect = GRect(10, 10, 20, 20)
+    rect.set_filled(True)
+    rect.set_color("red")
+    gw.add(rect)
+    return gw, rect
+
+
+def test_moved_rect_is_drawn_at_its_new_position(make_window, monkeypatch):
+    gw, rect = make_scene(make_window)
+    frame = gw.render()
+    assert frame.getpixel((20, 20)) == RED
+    assert frame.getpixel((60, 20)) == WHITE
+    boxes = record_redraws(gw, monkeypatch)
+    rect.move(40, 0)
+    frame = gw.render()
+    assert frame.getpixel((20, 20)) == WHITE
+    assert frame.getpixel((60, 20)) == RED
+    assert frame.getpixel((150, 80)) == WHITE
+    assert len(boxes) > 0
+    for x0, y0, x1, y1 in boxes:
+        assert x0 >= 0 and y0 >= 0
+        assert x1 <= 80 and y1 <= 40
+
+
+def test_unchanged_frame_redraws_nothing(make_window, monkeypatch):
+    gw, rect = make_scene(make_window)
+    first = gw.render().copy()
+    boxes = record_redraws(gw, monkeypatch)
+    frame = gw.render()
+    assert boxes == [ ]
+    assert list(frame.getdata()) == list(first.getdata())
@@ -0,0 +1,38 @@
+from pgl import GImage, GRect
+
+
+def test_callback_changes_reach_canvas_immediately(make_window):
+    gw = make_window(200, 200)
+    rect = GRect(10, 10, 20, 20)
+    gw.add(rect)
+    seen = [ ]
+
+    def step():
+        rect.move(5, 0)
+        seen.append(gw._canvas.coords(rect._tkid))
+
+    gw.set_timeout(step, 0)
+    gw._run_frame()
+    assert seen == [ [ 15.0, 10.0, 35.0, 30.0 ] ]
+
+
+def test_scale_and_rotate_inside_callback(make_window, image_path):
+    gw = make_window(600, 600)
+    img = GImage(image_path)
+    gw.add(img, 0, 0)
+    base_width = img.get_width()
+    widths = [ ]
+
+    def grow():
+        img.scale(6)
+        widths.append(img.get_width())
+
+    gw.set_timeout(grow, 0)
+    gw._run_frame()
+    assert widths == [ base_width * 6 ]
+    assert gw.get_element_at(base_width * 6 - 2, 2) is img
+    gw.set_timeout(lambda: img.rotate(90), 0)
+    gw._run_frame()
+    height = img.get_height()
+    assert height == base_width * 6
+    assert gw.get_element_at(2, height - 2) is img
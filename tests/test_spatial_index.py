@@ -0,0 +1,43 @@
+import random
+
+from pgl import GCompound, GLine, GOval, GRect
+
+
+def brute_force_hits(shapes, x, y):
+    return [ gobj for gobj in reversed(shapes) if gobj.contains(x, y) ]
+
+
+def test_index_matches_brute_force_hit_test():
+    rng = random.Random(5)
+    scene = GCompound()
+    scene.set_spatial_index(True)
+    shapes = [ ]
+    for i in range(60):
+        x = rng.uniform(-20, 380)
+        y = rng.uniform(-20, 280)
+        kind = i % 3
+        if kind == 0:
+            gobj = GRect(x, y, rng.uniform(1, 90), rng.uniform(1, 90))
+        elif kind == 1:
+            gobj = GOval(x, y, rng.uniform(1, 90), rng.uniform(1, 90))
+        else:
+            gobj = GLine(x, y, x + rng.uniform(-80, 80),
+                         y + rng.uniform(-80, 80))
+        scene.add(gobj)
+        shapes.append(gobj)
+    shapes.append(GRect(0, 0, 400, 300))
+    scene.add(shapes[-1])
+    for step in range(40):
+        gobj = rng.choice(shapes)
+        gobj.move(rng.uniform(-30, 30), rng.uniform(-30, 30))
+        if step % 7 == 0:
+            gobj.send_to_front()
+            shapes.remove(gobj)
+            shapes.append(gobj)
+    for i in range(500):
+        x = rng.uniform(-30, 430)
+        y = rng.uniform(-30, 330)
+        expected = brute_force_hits(shapes, x, y)
+        assert scene.get_elements_at(x, y) == expected
+        assert scene.get_element_at(x, y) is (expected[0] if expected
+                                           else None)
@@ -0,0 +1,17 @@
+def test_finished_and_stopped_timers_are_released(make_window):
+    gw = make_window(100, 100)
+    fired = [ ]
+    for i in range(50):
+        gw.set_timeout(lambda i=i: fired.append(i), 0)
+    interval = gw.set_interval(lambda: None, 60000)
+    assert gw.get_active_timer_count() == 51
+    gw._run_frame()
+    assert fired == list(range(50))
+    assert gw.get_active_timer_count() == 1
+    for i in range(1000):
+        interval.stop()
+        interval.start()
+    assert gw.get_active_timer_count() == 1
+    assert len(gw._timer_queue) <= 2 * len(gw._timers) + 16
+    interval.stop()
+    assert gw.get_active_timer_count() == 0
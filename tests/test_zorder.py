@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from pgl import GCompound, GRect, GOval
+
+
+def stacking_order(gobj):
+    if isinstance(gobj, GCompound):
+        order = [ ]
+        for child in gobj._contents:
+            order.extend(stacking_order(child))
+        return order
+    return [ gobj._tkid ]
+
+
+def assert_consistent(gw):
+    assert list(gw._canvas.find_all()) == stacking_order(gw._base)
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_canvas_order_follows_scene_graph(make_window, batched):
+    rng = random.Random(19)
+    gw = make_window(300, 300)
+    groups = [ GCompound() for i in range(3) ]
+    objects = [ ]
+    for i in range(12):
+        gobj = GRect(i, i, 5, 5) if i % 2 == 0 else GOval(i, i, 5, 5)
+        groups[i % 3].add(gobj)
+        objects.append(gobj)
+    for group in groups:
+        gw.add(group)
+    gw.add(GRect(0, 0, 10, 10))
+    operations = [ "send_forward", "send_backward",
+                   "send_to_front", "send_to_back" ]
+    for step in range(200):
+        if batched and step % 10 == 0:
+            gw.begin_batch()
+        gobj = rng.choice(objects + groups)
+        getattr(gobj, rng.choice(operations))()
+        if batched and step % 10 == 9:
+            gw.commit_batch()
+        if not batched or step % 10 == 9:
+            assert_consistent(gw)
+
+
+def test_remove_and_readd_keeps_order(make_window):
+    gw = make_window(300, 300)
+    group = GCompound()
+    rects = [ GRect(i * 10, 0, 5, 5) for i in range(5) ]
+    for rect in rects:
+        group.add(rect)
+    gw.add(group)
+    gw.add(GOval(0, 0, 20, 20))
+    group.remove(rects[2])
+    assert_consistent(gw)
+    group.add(rects[2])
+    rects[0].send_to_front()
+    assert_consistent(gw)
+    assert group.get_element(group.get_element_count() - 1) is rects[0]